@@ -20,9 +20,20 @@ class Settings(BaseSettings):
     # Database
     database_url: str
     
+    # Connection pools (sized together against the server's max_connections
+    # budget): the raw query pool serving feature, photo and tile queries,
+    # and the `databases` pool serving metadata queries
+    db_pool_min_size: int = 5
+    db_pool_max_size: int = 25
+    db_metadata_pool_max_size: int = 5
+    db_statement_cache_size: int = 1024
+    
     # Supabase (optional, for direct API access if needed)
     api_key: str | None = None
     
+    # Token required by the admin endpoints (unset = admin endpoints disabled)
+    admin_token: str | None = None
+    
     # CORS
     cors_origins: List[str] = ["http://localhost:5173", "http://localhost:3000"]
     
@@ -34,6 +45,13 @@ class Settings(BaseSettings):
     # Pagination defaults
     default_page_size: int = 100
     max_page_size: int = 1000
+    
+    # GeoJSON response cache; entries are capped in number and total size,
+    # and a streamed body larger than geojson_cache_max_bytes is not cached
+    geojson_cache_ttl: int = 300
+    geojson_cache_size: int = 64
+    geojson_cache_max_bytes: int = 4 * 1024 * 1024
+    geojson_cache_total_bytes: int = 128 * 1024 * 1024
 
 
 # Create a global settings instance
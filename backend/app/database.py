@@ -1,6 +1,199 @@
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import asyncpg
 from databases import Database
-import os
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-database = Database(DATABASE_URL)
+from .config import settings
+
+
+async def init_connection(connection) -> None:
+    """
+    Configure a new asyncpg connection from the pool.
+    
+    json and jsonb values are kept as raw text, so GeoJSON built by PostGIS
+    can be passed straight into a response without being decoded first.
+    """
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=lambda value: value,
+            decoder=lambda value: value,
+            schema="pg_catalog",
+            format="text"
+        )
+
+
+DATABASE_URL = settings.database_url
+
+# JIT compilation costs more than it saves on these short queries
+SERVER_SETTINGS = {"jit": "off"}
+
+# Serves the named-parameter queries run through `databases` (metadata,
+# counts, health checks)
+database = Database(
+    DATABASE_URL,
+    min_size=1,
+    max_size=settings.db_metadata_pool_max_size,
+    statement_cache_size=settings.db_statement_cache_size,
+    server_settings=SERVER_SETTINGS,
+    init=init_connection
+)
+
+# asyncpg pool behind fetch_value, fetch_row and iterate_values, which run
+# every feature, photo and tile query; held here rather than borrowed from
+# `databases` so its size and acquire times can be read through asyncpg's
+# public API. Opened by connect_database.
+_pool: Optional[asyncpg.Pool] = None
+
+# Recent acquire times from _pool in seconds, for pool diagnostics
+_acquire_times: Deque[float] = deque(maxlen=1000)
+
+
+async def connect_database() -> None:
+    """Open the `databases` connection and the raw query pool."""
+    global _pool
+    await database.connect()
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            # asyncpg does not understand SQLAlchemy-style driver suffixes
+            re.sub(r"^(\w+)\+\w+://", r"\1://", DATABASE_URL),
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            statement_cache_size=settings.db_statement_cache_size,
+            server_settings=SERVER_SETTINGS,
+            init=init_connection
+        )
+
+
+async def disconnect_database() -> None:
+    """Close the raw query pool and the `databases` connection."""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+    await database.disconnect()
+
+
+def get_pool_stats() -> Optional[Dict[str, Any]]:
+    """
+    Report usage of the raw query pool.
+    
+    Covers the connections used by fetch_value, fetch_row and
+    iterate_values; the small `databases` pool is not included.
+    
+    Returns:
+        Dictionary with the pool's min, max, current and idle sizes, or None
+        if the database is not connected
+    """
+    pool = _pool
+    if pool is None:
+        return None
+    
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "saturated": size >= pool.get_max_size() and idle == 0
+    }
+
+
+def get_acquire_latency() -> Dict[str, Optional[float]]:
+    """
+    Summarize recent connection acquire times from the raw query pool.
+    
+    Returns:
+        Dictionary with the number of samples and the p50/p95 acquire time
+        in milliseconds (None when there are no samples yet)
+    """
+    samples = sorted(_acquire_times)
+    if not samples:
+        return {"samples": 0, "p50_ms": None, "p95_ms": None}
+    
+    def percentile(fraction: float) -> float:
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return round(samples[index] * 1000, 3)
+    
+    return {
+        "samples": len(samples),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95)
+    }
+
+
+@asynccontextmanager
+async def _acquire() -> AsyncIterator[asyncpg.Connection]:
+    """Acquire a raw query pool connection, recording the time it took."""
+    if _pool is None:
+        raise RuntimeError("Database is not connected")
+    started = time.perf_counter()
+    async with _pool.acquire() as connection:
+        _acquire_times.append(time.perf_counter() - started)
+        yield connection
+
+
+async def fetch_value(query: str, *args: Any) -> Any:
+    """
+    Run a positional ($1, $2...) query on a raw query pool connection.
+    
+    Skips the per-call SQLAlchemy compilation done by `databases`. asyncpg
+    prepares each distinct query text once per pooled connection and reuses
+    the statement from its cache afterwards.
+    
+    Args:
+        query: SQL using positional placeholders
+        *args: Parameter values in placeholder order
+        
+    Returns:
+        Value of the first column of the first row, or None
+    """
+    async with _acquire() as connection:
+        return await connection.fetchval(query, *args)
+
+
+async def fetch_row(query: str, *args: Any) -> Optional[Any]:
+    """
+    Run a positional ($1, $2...) query and return its first row.
+    
+    Like `fetch_value`, the statement is prepared once per pooled
+    connection and bound on later calls.
+    
+    Args:
+        query: SQL using positional placeholders
+        *args: Parameter values in placeholder order
+        
+    Returns:
+        First row as an asyncpg Record, or None
+    """
+    async with _acquire() as connection:
+        return await connection.fetchrow(query, *args)
+
 
+async def iterate_values(query: str, *args: Any, prefetch: int = 200) -> AsyncIterator[Any]:
+    """
+    Stream the first column of a positional ($1, $2...) query's rows.
+    
+    Rows are read through a server-side cursor on a raw query pool
+    connection, `prefetch` rows per round trip, and handed out as they
+    arrive without being wrapped in `databases` Record objects.
+    
+    Args:
+        query: SQL using positional placeholders
+        *args: Parameter values in placeholder order
+        prefetch: Number of rows fetched from the cursor at a time
+        
+    Yields:
+        Value of the first column of each row
+    """
+    async with _acquire() as connection:
+        # Cursors only exist inside a transaction
+        async with connection.transaction():
+            async for row in connection.cursor(query, *args, prefetch=prefetch):
+                yield row[0]
@@ -1,13 +1,37 @@
+import logging
+
 from fastapi import FastAPI
+from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from .database import database
+from .database import (
+    connect_database,
+    database,
+    disconnect_database,
+    fetch_value,
+    get_acquire_latency,
+    get_pool_stats
+)
 from .config import settings
-from .routers import geologic_router, photos_router
+from .middleware import ETagMiddleware
+from .responses import ORJSONResponse
+from .routers import admin_router, geologic_router, photos_router
+from .routers.geologic import get_service as get_geologic_service
+from .routers.photos import get_service as get_photos_service
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    # Optional; responses are gzip-compressed only
+    BrotliMiddleware = None
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -16,12 +40,23 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for startup and shutdown events.
     """
     # Startup
-    await database.connect()
-    print("Database connected")
+    await connect_database()
+    logger.info("Database connected")
+    # A failed warm-up only costs the first request its cache loads, since
+    # the services load lazily too; it must not keep the API from starting
+    for name, get_service in (
+        ("geologic", get_geologic_service),
+        ("photos", get_photos_service)
+    ):
+        try:
+            await get_service().warm()
+        except Exception:
+            logger.warning("Could not warm the %s service caches", name, exc_info=True)
+    logger.info("Caches warmed")
     yield
     # Shutdown
-    await database.disconnect()
-    print("Database disconnected")
+    await disconnect_database()
+    logger.info("Database disconnected")
 
 
 # Initialize FastAPI app
@@ -29,6 +64,7 @@ app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="API for serving geologic data as GeoJSON for interactive mapping",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -37,13 +73,36 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # The API is read-only for browsers (the admin endpoints are called
+    # server-side); explicit lists keep preflight handling to plain lookups
+    allow_methods=["GET", "OPTIONS"],
+    allow_headers=["content-type", "if-none-match", "accept"],
+)
+
+# Conditional GET support so clients can revalidate unchanged GeoJSON
+app.add_middleware(
+    ETagMiddleware,
+    paths=(settings.api_v1_prefix,),
+    max_age=60,
 )
 
+# Compress responses; added last so ETags are computed on the uncompressed body.
+# Both middlewares set Vary: Accept-Encoding; Brotli falls back to gzip for
+# clients that do not accept br
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=4,
+        minimum_size=1024,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(geologic_router, prefix=settings.api_v1_prefix)
 app.include_router(photos_router, prefix=settings.api_v1_prefix)
+app.include_router(admin_router, prefix=settings.api_v1_prefix)
 
 
 @app.get("/", tags=["Root"])
@@ -69,11 +128,21 @@ async def health_check():
     Health check endpoint.
     """
     try:
-        # Test database connection
+        # Test both database pools
         await database.fetch_one("SELECT 1")
+        await fetch_value("SELECT 1")
+        
+        pool = get_pool_stats()
+        if pool and pool["saturated"]:
+            logger.warning(
+                "Database pool saturated (%d/%d connections in use)",
+                pool["in_use"], pool["max_size"]
+            )
+        
         return {
             "status": "healthy",
-            "database": "connected"
+            "database": "connected",
+            "pool": pool
         }
     except Exception as e:
         return {
@@ -83,40 +152,30 @@ async def health_check():
         }
 
 
+@app.get("/debug/pool", tags=["Health"])
+async def pool_stats():
+    """
+    Connection pool diagnostics.
+    
+    Reports the raw query pool's size and idle connections, plus p50/p95
+    connection acquire times over its recent queries (every feature, photo
+    and tile query; metadata queries use a separate pool and are not counted).
+    """
+    return {
+        "pool": get_pool_stats(),
+        "acquire": get_acquire_latency()
+    }
+
+
 # Legacy endpoint for backward compatibility (atlas_maps)
 @app.get("/atlas_maps", tags=["Legacy"])
 async def get_atlas_maps():
     """
     Legacy endpoint for atlas_maps data (for backward compatibility).
     
-    Consider using /api/v1/geologic/atlas_maps instead.
+    Permanently redirects to /api/v1/geologic/atlas_maps.
     """
-    query = """
-    SELECT json_build_object(
-        'type', 'FeatureCollection',
-        'features', json_agg(
-            json_build_object(
-                'type', 'Feature',
-                'geometry', ST_AsGeoJSON(geometry)::json,
-                'properties', json_build_object(
-                    'OBJECTID', "OBJECTID",
-                    'Name', "Name",
-                    'ID', "ID",
-                    'MAP_SYMBOL', "MAP_SYMBOL",
-                    'Shape_Length', "Shape_Length"
-                )
-            )
-        )
-    ) AS geojson
-    FROM atlas_maps;
-    """
-    result = await database.fetch_one(query)
-    
-    if result and result["geojson"]:
-        return result["geojson"]
-    
-    # Return empty FeatureCollection if no data
-    return {
-        "type": "FeatureCollection",
-        "features": []
-    }
+    return RedirectResponse(
+        url=f"{settings.api_v1_prefix}/geologic/atlas_maps",
+        status_code=308
+    )
@@ -0,0 +1,6 @@
+"""
+ASGI middleware for the application.
+"""
+from .etag import ETagMiddleware
+
+__all__ = ["ETagMiddleware"]
@@ -0,0 +1,117 @@
+"""
+Conditional GET support via ETag validators.
+Lets clients revalidate unchanged GeoJSON instead of downloading it again.
+"""
+import hashlib
+from typing import List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ETagMiddleware:
+    """
+    ASGI middleware that adds weak ETags to successful GET responses.
+    
+    The ETag is a hash of the response body. When the request's
+    If-None-Match header matches, the body is replaced by a 304 Not Modified.
+    Streamed responses (no Content-Length) and responses that already carry
+    an ETag are passed through untouched.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Sequence[str] = ("/",),
+        max_age: int = 60
+    ):
+        """
+        Initialize the middleware.
+        
+        Args:
+            app: ASGI application to wrap
+            paths: URL path prefixes the middleware applies to
+            max_age: Cache-Control max-age in seconds for tagged responses
+        """
+        self.app = app
+        self.paths = tuple(paths)
+        self.cache_control = f"public, max-age={max_age}, must-revalidate"
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start_message: Optional[Message] = None
+        body_parts: List[bytes] = []
+        passthrough = False
+        
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start_message, passthrough
+            
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] != 200
+                    or "content-length" not in headers
+                    or "etag" in headers
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            # Buffer the body until it is complete so it can be hashed
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            body = b"".join(body_parts)
+            etag = 'W/"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            
+            headers = MutableHeaders(scope=start_message)
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = self.cache_control
+            
+            if if_none_match and etag_matches(if_none_match, etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                start_message["status"] = 304
+                body = b""
+            
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_with_etag)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag using weak comparison.
+    
+    Args:
+        if_none_match: Value of the If-None-Match request header
+        etag: ETag of the current representation
+        
+    Returns:
+        True if the client's cached copy is still current
+    """
+    if if_none_match.strip() == "*":
+        return True
+    
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
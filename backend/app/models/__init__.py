@@ -5,8 +5,9 @@ from .geologic import (
     GeoJSONFeature,
     GeoJSONFeatureCollection,
     BoundingBox,
-    FilterParams,
+    FeatureFilters,
     TableInfo,
+    TableExtent,
     TableListResponse
 )
 
@@ -14,8 +15,9 @@ __all__ = [
     "GeoJSONFeature",
     "GeoJSONFeatureCollection",
     "BoundingBox",
-    "FilterParams",
+    "FeatureFilters",
     "TableInfo",
+    "TableExtent",
     "TableListResponse"
 ]
 
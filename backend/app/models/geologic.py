@@ -1,8 +1,42 @@
 """
 Pydantic models for geologic data API requests and responses.
 """
+import re
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Four comma-separated decimal numbers, optionally surrounded by whitespace
+_NUMBER = r"\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))\s*"
+_BBOX_RE = re.compile(",".join([_NUMBER] * 4))
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """
+    Parse a "min_lng,min_lat,max_lng,max_lat" bounding box string.
+    
+    Args:
+        value: Bounding box string
+        
+    Returns:
+        Tuple of (min_lng, min_lat, max_lng, max_lat)
+        
+    Raises:
+        ValueError: If the string is malformed or the coordinates are out of range
+    """
+    match = _BBOX_RE.fullmatch(value)
+    if match is None:
+        raise ValueError(
+            "bbox must be four comma-separated numbers: min_lng,min_lat,max_lng,max_lat"
+        )
+    min_lng, min_lat, max_lng, max_lat = map(float, match.groups())
+    
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180
+            and -90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValueError("bbox coordinates are out of range")
+    
+    return min_lng, min_lat, max_lng, max_lat
 
 
 class BoundingBox(BaseModel):
@@ -16,23 +50,26 @@ class BoundingBox(BaseModel):
     max_lat: float = Field(..., description="Maximum latitude (north)", ge=-90, le=90)
 
 
-class FilterParams(BaseModel):
+@dataclass(frozen=True, slots=True)
+class FeatureFilters:
     """
-    Query parameters for filtering geologic features.
-    """
-    # Pagination
-    limit: Optional[int] = Field(None, ge=1, description="Maximum number of features to return (None = no limit)")
-    offset: int = Field(0, description="Number of features to skip", ge=0)
-    
-    # Spatial filter
-    bbox: Optional[str] = Field(None, description="Bounding box: min_lng,min_lat,max_lng,max_lat")
+    Filter values passed from route handlers to the service layer.
     
-    # Property filters (dynamic based on table)
-    name: Optional[str] = Field(None, description="Filter by name (case-insensitive partial match)")
-    map_symbol: Optional[str] = Field(None, description="Filter by map symbol")
-    feature_type: Optional[str] = Field(None, description="Filter by feature type")
-    region: Optional[str] = Field(None, description="Filter by region")
-    fan_id: Optional[int] = Field(None, description="Filter by fan ID")
+    Built directly from query parameters FastAPI has already validated, so
+    no further validation runs per request. Instances are hashable and
+    double as response cache keys.
+    """
+    limit: Optional[int] = None
+    offset: int = 0
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    name: Optional[str] = None
+    map_symbol: Optional[str] = None
+    feature_type: Optional[str] = None
+    region: Optional[str] = None
+    fan_id: Optional[int] = None
+    bbox_false_positives_ok: bool = False
+    after: Optional[str] = None
+    zoom: Optional[int] = None
 
 
 class GeoJSONFeature(BaseModel):
@@ -67,6 +104,17 @@ class TableInfo(BaseModel):
     description: Optional[str] = Field(None, description="Table description")
 
 
+class TableExtent(BaseModel):
+    """
+    Bounding box of every feature in a table, in WGS84 (EPSG:4326).
+    """
+    name: str = Field(..., description="Table name")
+    bbox: Optional[Tuple[float, float, float, float]] = Field(
+        None,
+        description="Extent as (min_lng, min_lat, max_lng, max_lat); null for an empty table"
+    )
+
+
 class TableListResponse(BaseModel):
     """
     Response containing list of available tables.
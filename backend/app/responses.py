@@ -0,0 +1,38 @@
+"""
+Custom response classes for the application.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson.
+    
+    Used as the app-wide default so dict payloads are encoded by orjson's
+    C implementation instead of the stdlib json module.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class GeoJSONResponse(Response):
+    """
+    Pre-encoded GeoJSON response.
+    
+    The body is the FeatureCollection text PostGIS built; it is sent as-is
+    and never parsed or re-serialized in Python.
+    """
+    
+    media_type = "application/geo+json"
+
+
+class MVTResponse(Response):
+    """
+    Binary Mapbox Vector Tile response.
+    """
+    
+    media_type = "application/vnd.mapbox-vector-tile"
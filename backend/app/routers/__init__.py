@@ -3,6 +3,7 @@ API route handlers.
 """
 from .geologic import router as geologic_router
 from .photos import router as photos_router
+from .admin import router as admin_router
 
-__all__ = ["geologic_router", "photos_router"]
+__all__ = ["geologic_router", "photos_router", "admin_router"]
 
@@ -0,0 +1,53 @@
+"""
+API routes for administrative endpoints.
+"""
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.routers.geologic import geojson_cache, get_service as get_geologic_service
+from app.routers.photos import get_service as get_photos_service
+from app.services.geologic_service import GeologicDataService
+from app.services.photos_service import PhotosService
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin_token(x_admin_token: Optional[str]) -> None:
+    """
+    Check the admin token sent with a request.
+    
+    Raises:
+        HTTPException: 404 if no admin token is configured, 403 if the token
+        is missing or wrong
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post(
+    "/cache/invalidate",
+    summary="Invalidate in-memory caches",
+    description="Drops cached responses and table/photo metadata so they are reloaded on the next request. "
+                "Requires the X-Admin-Token header. Meant to be called server-side (e.g. from a "
+                "data load script); CORS does not allow it from browsers."
+)
+async def invalidate_caches(
+    x_admin_token: Optional[str] = Header(None),
+    geologic_service: GeologicDataService = Depends(get_geologic_service),
+    photos_service: PhotosService = Depends(get_photos_service)
+):
+    """
+    Invalidate all in-memory caches, e.g. after the data has been reloaded.
+    """
+    require_admin_token(x_admin_token)
+    
+    geojson_cache.clear()
+    geologic_service.invalidate_metadata()
+    photos_service.invalidate()
+    return {"status": "invalidated"}
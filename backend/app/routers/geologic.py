@@ -1,27 +1,212 @@
 """
 API routes for geologic data endpoints.
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional
+import hashlib
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Depends, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Hashable, Optional, Tuple
+from functools import lru_cache
 
+from app.config import settings
 from app.database import database
+from app.middleware.etag import etag_matches
 from app.models.geologic import (
-    FilterParams,
+    FeatureFilters,
     GeoJSONFeatureCollection,
+    parse_bbox,
+    TableExtent,
     TableListResponse,
     TableInfo
 )
-from app.services.geologic_service import GeologicDataService
+from app.responses import GeoJSONResponse, MVTResponse
+from app.services.geologic_service import GeologicDataService, InvalidCursorError
+from app.utils.cache import TTLCache
 
 
 router = APIRouter(prefix="/geologic", tags=["Geologic Data"])
 
+# Tile contents at a given z/x/y only change when the data is reloaded
+MVT_CACHE_CONTROL = "public, max-age=86400, immutable"
 
+# Filter and bbox responses may be reused by shared caches for as long as our
+# own response cache keeps them; whole tables are not marked, so an admin
+# cache invalidation reaches clients at once
+GEOJSON_CACHE_CONTROL = f"public, max-age={settings.geojson_cache_ttl}"
+
+# Encoded GeoJSON responses and their ETags, keyed by table name and filter values
+geojson_cache = TTLCache(
+    maxsize=settings.geojson_cache_size,
+    ttl=settings.geojson_cache_ttl,
+    maxbytes=settings.geojson_cache_total_bytes,
+    sizeof=lambda entry: len(entry[0])
+)
+
+
+@lru_cache(maxsize=1)
 def get_service() -> GeologicDataService:
-    """Dependency to get service instance."""
+    """Dependency to get the shared service instance."""
     return GeologicDataService(database)
 
 
+def get_bbox(
+    bbox: Optional[str] = Query(
+        None,
+        description="Bounding box: min_lng,min_lat,max_lng,max_lat (e.g., -104.5,31.5,-103.5,32.5)",
+        examples={"example1": {"value": "-104.5,31.5,-103.5,32.5"}}
+    )
+) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Dependency to parse and validate the bbox query parameter.
+    
+    Routes taking a bbox string get it through this dependency, which
+    parses it with parse_bbox and reports malformed boxes as 422.
+    
+    Returns:
+        Tuple of (min_lng, min_lat, max_lng, max_lat) or None if not provided
+        
+    Raises:
+        HTTPException: If the bounding box is malformed or out of range
+    """
+    if not bbox:
+        return None
+    
+    try:
+        return parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def get_cached_geojson(
+    service: GeologicDataService,
+    table_name: str,
+    filters: FeatureFilters,
+    if_none_match: Optional[str] = None,
+    cache_control: Optional[str] = None
+) -> Response:
+    """
+    Get a GeoJSON response for a table, serving repeat requests from the cache.
+    
+    The FeatureCollection is built and encoded by PostGIS, so the body is
+    passed through untouched and a cache hit skips the database entirely.
+    Concurrent identical requests share a single database query. Responses
+    carry an ETag; a client that already has the body gets a 304 instead.
+    
+    Args:
+        service: Service instance used on a cache miss
+        table_name: Name of the table to query
+        filters: Filter parameters
+        if_none_match: The request's If-None-Match header, if any
+        cache_control: Cache-Control header for the response, if any
+        
+    Returns:
+        GeoJSON response containing the FeatureCollection, or an empty 304
+        response if its ETag matches if_none_match
+        
+    Raises:
+        ValueError: If table doesn't exist or is excluded
+        InvalidCursorError: If filters.after cannot page the table
+    """
+    body, etag = await geojson_cache.get_or_set(
+        _cache_key(table_name, filters),
+        lambda: service.get_features_geojson(table_name, filters)
+    )
+    return _geojson_response(body, etag, if_none_match, cache_control)
+
+
+async def get_streamed_geojson(
+    service: GeologicDataService,
+    table_name: str,
+    filters: FeatureFilters,
+    if_none_match: Optional[str] = None
+) -> Response:
+    """
+    Get a GeoJSON response for a table, streaming it on a cache miss.
+    
+    A page (filters.limit set) is also collected into the cache once its
+    stream completes, unless it grows past geojson_cache_max_bytes; a
+    whole-table stream is never buffered, so memory use stays flat per row.
+    Only cached bodies carry an ETag, since a stream's is not known until
+    it ends.
+    
+    The status line is sent before the first row is read, so a database
+    error partway through cannot become an error response: the stream is
+    aborted instead, and the client sees an incomplete chunked body rather
+    than a complete FeatureCollection. Such a body is never cached.
+    
+    Args:
+        service: Service instance used on a cache miss
+        table_name: Name of the table to query
+        filters: Filter parameters
+        if_none_match: The request's If-None-Match header, if any
+        
+    Returns:
+        Cached GeoJSON response (or empty 304 response) or streaming response
+        
+    Raises:
+        ValueError: If table doesn't exist or is excluded
+        InvalidCursorError: If filters.after cannot page the table
+    """
+    if filters.limit is None:
+        chunks = await service.stream_features_geojson(table_name, filters)
+        return StreamingResponse(chunks, media_type=GeoJSONResponse.media_type)
+    
+    key = _cache_key(table_name, filters)
+    cached = geojson_cache.get(key)
+    if cached is not None:
+        return _geojson_response(*cached, if_none_match)
+    
+    chunks = await service.stream_features_geojson(table_name, filters)
+    return StreamingResponse(
+        _cache_stream(key, chunks),
+        media_type=GeoJSONResponse.media_type
+    )
+
+
+def _cache_key(table_name: str, filters: FeatureFilters) -> Hashable:
+    """Build the response cache key for a table query."""
+    return (table_name, filters)
+
+
+def _geojson_response(
+    body: bytes,
+    digest: str,
+    if_none_match: Optional[str],
+    cache_control: Optional[str] = None
+) -> Response:
+    """
+    Build the response for a GeoJSON body, or a 304 if the client has it.
+    
+    The ETag comes from the body's md5, so ETagMiddleware passes the
+    response through without hashing it again. It is weak, like the
+    middleware's, since compression changes the bytes sent.
+    """
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return GeoJSONResponse(content=body, headers=headers)
+
+
+async def _cache_stream(key: Hashable, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Pass chunks through, caching the complete body if it is small enough."""
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= settings.geojson_cache_max_bytes:
+                parts.append(chunk)
+            else:
+                parts = None
+        yield chunk
+    
+    if parts is not None:
+        body = b"".join(parts)
+        geojson_cache.set(key, (body, hashlib.md5(body).hexdigest()))
+
+
 @router.get(
     "/tables",
     response_model=TableListResponse,
@@ -29,12 +214,19 @@ def get_service() -> GeologicDataService:
     description="Returns a list of all available geologic data tables with metadata."
 )
 async def list_tables(
+    exact_count: bool = Query(
+        False,
+        description="Count every table's features exactly instead of using the planner's estimate"
+    ),
     service: GeologicDataService = Depends(get_service)
 ) -> TableListResponse:
     """
     Get list of all available geologic data tables.
     """
-    tables = await service.get_available_tables()
+    try:
+        tables = await service.get_available_tables(exact_count=exact_count)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing tables: {str(e)}")
     return TableListResponse(tables=tables, total=len(tables))
 
 
@@ -61,23 +253,36 @@ async def get_table_info(
     "/{table_name}",
     summary="Get all features from a table",
     description="Returns all features from the specified table as GeoJSON. Supports pagination.",
-    response_description="GeoJSON FeatureCollection"
+    response_description="GeoJSON FeatureCollection",
+    response_class=GeoJSONResponse,
+    responses={200: {"model": GeoJSONFeatureCollection}}
 )
 async def get_features(
     table_name: str,
     limit: Optional[int] = Query(None, ge=1, description="Maximum number of features to return (None = no limit)"),
     offset: int = Query(0, ge=0, description="Number of features to skip"),
+    after: Optional[str] = Query(
+        None,
+        description="Return features whose primary key sorts after this value "
+                    "(keyset pagination); replaces offset"
+    ),
+    if_none_match: Optional[str] = Header(None),
     service: GeologicDataService = Depends(get_service)
 ):
     """
     Get all features from a geologic data table.
     
-    Returns GeoJSON FeatureCollection format.
+    Returns GeoJSON FeatureCollection format, streamed from the database
+    so large tables are never held in memory at once. Pages (with a limit)
+    that were streamed before are served from the response cache with an
+    ETag; a streamed response has none. A database error partway through
+    a stream aborts the response, leaving the body incomplete.
     """
     try:
-        filters = FilterParams(limit=limit, offset=offset)
-        result = await service.get_features_geojson(table_name, filters)
-        return result
+        filters = FeatureFilters(limit=limit, offset=offset, after=after)
+        return await get_streamed_geojson(service, table_name, filters, if_none_match)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -89,47 +294,62 @@ async def get_features(
     summary="Filter features with query parameters",
     description="Returns filtered features from the specified table as GeoJSON. "
                 "Supports filtering by properties and spatial bounding box.",
-    response_description="GeoJSON FeatureCollection"
+    response_description="GeoJSON FeatureCollection",
+    response_class=GeoJSONResponse,
+    responses={200: {"model": GeoJSONFeatureCollection}}
 )
 async def filter_features(
     table_name: str,
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of features to return"),
     offset: int = Query(0, ge=0, description="Number of features to skip"),
-    bbox: Optional[str] = Query(
-        None, 
-        description="Bounding box: min_lng,min_lat,max_lng,max_lat (e.g., -104.5,31.5,-103.5,32.5)",
-        examples={"example1": {"value":"-104.5,31.5,-103.5,32.5"}}
+    after: Optional[str] = Query(
+        None,
+        description="Return features whose primary key sorts after this value "
+                    "(keyset pagination); replaces offset"
+    ),
+    bbox: Optional[Tuple[float, float, float, float]] = Depends(get_bbox),
+    zoom: Optional[int] = Query(
+        None,
+        ge=0,
+        le=30,
+        description="Map zoom level; low zoom levels are served simplified geometries"
     ),
     name: Optional[str] = Query(None, description="Filter by name (case-insensitive partial match)"),
     map_symbol: Optional[str] = Query(None, description="Filter by map symbol"),
     feature_type: Optional[str] = Query(None, description="Filter by feature type"),
     region: Optional[str] = Query(None, description="Filter by region"),
     fan_id: Optional[int] = Query(None, description="Filter by fan ID"),
+    if_none_match: Optional[str] = Header(None),
     service: GeologicDataService = Depends(get_service)
 ):
     """
     Get filtered features from a geologic data table.
     
     Supports multiple filter types:
-    - Spatial filtering via bounding box
+    - Spatial filtering via bounding box, with simplified geometries at low zoom
     - Property-based filtering (name, map_symbol, feature_type, region, fan_id)
-    - Pagination (limit, offset)
+    - Pagination (limit, offset, or after for keyset pagination)
     
     Returns GeoJSON FeatureCollection format.
     """
     try:
-        filters = FilterParams(
+        filters = FeatureFilters(
             limit=limit,
             offset=offset,
+            after=after,
             bbox=bbox,
+            zoom=zoom,
             name=name,
             map_symbol=map_symbol,
             feature_type=feature_type,
             region=region,
             fan_id=fan_id
         )
-        result = await service.get_features_geojson(table_name, filters)
-        return result
+        return await get_cached_geojson(
+            service, table_name, filters, if_none_match, GEOJSON_CACHE_CONTROL
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -140,7 +360,9 @@ async def filter_features(
     "/{table_name}/bbox",
     summary="Query features within a bounding box",
     description="Returns features that intersect with the specified bounding box.",
-    response_description="GeoJSON FeatureCollection"
+    response_description="GeoJSON FeatureCollection",
+    response_class=GeoJSONResponse,
+    responses={200: {"model": GeoJSONFeatureCollection}}
 )
 async def get_features_in_bbox(
     table_name: str,
@@ -150,6 +372,23 @@ async def get_features_in_bbox(
     max_lat: float = Query(..., description="Maximum latitude (north)", ge=-90, le=90),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of features to return"),
     offset: int = Query(0, ge=0, description="Number of features to skip"),
+    after: Optional[str] = Query(
+        None,
+        description="Return features whose primary key sorts after this value "
+                    "(keyset pagination); replaces offset"
+    ),
+    zoom: Optional[int] = Query(
+        None,
+        ge=0,
+        le=30,
+        description="Map zoom level; low zoom levels are served simplified geometries"
+    ),
+    exact: bool = Query(
+        True,
+        description="Test geometries exactly; false also returns features whose "
+                    "bounding box overlaps without the geometry intersecting"
+    ),
+    if_none_match: Optional[str] = Header(None),
     service: GeologicDataService = Depends(get_service)
 ):
     """
@@ -161,16 +400,76 @@ async def get_features_in_bbox(
     Coordinates should be in WGS84 (EPSG:4326).
     """
     try:
-        bbox_str = f"{min_lng},{min_lat},{max_lng},{max_lat}"
-        filters = FilterParams(
+        filters = FeatureFilters(
             limit=limit,
             offset=offset,
-            bbox=bbox_str
+            after=after,
+            bbox=(min_lng, min_lat, max_lng, max_lat),
+            zoom=zoom,
+            bbox_false_positives_ok=not exact
+        )
+        return await get_cached_geojson(
+            service, table_name, filters, if_none_match, GEOJSON_CACHE_CONTROL
         )
-        result = await service.get_features_geojson(table_name, filters)
-        return result
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying bounding box: {str(e)}")
 
+
+@router.get(
+    "/{table_name}/extent",
+    response_model=TableExtent,
+    summary="Get the extent of a table",
+    description="Returns the bounding box of every feature in the specified table."
+)
+async def get_table_extent(
+    table_name: str,
+    service: GeologicDataService = Depends(get_service)
+) -> TableExtent:
+    """
+    Get the bounding box of a geologic data table, in WGS84 (EPSG:4326).
+    """
+    try:
+        bbox = await service.get_table_extent(table_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing extent: {str(e)}")
+    
+    return TableExtent(name=table_name, bbox=bbox)
+
+
+@router.get(
+    "/{table_name}/mvt/{z}/{x}/{y}",
+    summary="Get a vector tile for a table",
+    description="Returns the features of one web map tile as a Mapbox Vector Tile.",
+    response_description="Mapbox Vector Tile",
+    response_class=MVTResponse
+)
+async def get_features_mvt(
+    table_name: str,
+    z: int = Path(..., ge=0, le=30, description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row"),
+    service: GeologicDataService = Depends(get_service)
+):
+    """
+    Get a Mapbox Vector Tile for a geologic data table.
+    
+    Tiles use the standard XYZ (Web Mercator) scheme and contain one layer
+    named after the table, with every non-geometry column as attributes.
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=422, detail=f"Tile {z}/{x}/{y} is out of range")
+    
+    try:
+        tile = await service.get_features_mvt(table_name, z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building tile: {str(e)}")
+    
+    return MVTResponse(content=tile, headers={"Cache-Control": MVT_CACHE_CONTROL})
@@ -1,25 +1,39 @@
 """
 API routes for photo panel endpoints.
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from typing import List, Literal, Optional
+from functools import lru_cache
 
 from app.database import database
 from app.models.photos import PhotoInfo, PhotoListResponse, PhotoDetailResponse
+from app.responses import MVTResponse
 from app.services.photos_service import PhotosService
 
 
 router = APIRouter(prefix="/photos", tags=["Photos"])
 
 
+@lru_cache(maxsize=1)
 def get_service() -> PhotosService:
-    """Dependency to get service instance."""
+    """Dependency to get the shared service instance."""
     return PhotosService(database)
 
 
+def _photo_list_response(photos: List[PhotoInfo]) -> Response:
+    """
+    Encode a photo list as a JSON response.
+    
+    The models are serialized by pydantic-core in one pass, instead of
+    FastAPI's jsonable_encoder walking every geometry coordinate in Python.
+    """
+    result = PhotoListResponse.model_construct(photos=photos, total=len(photos))
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+
 @router.get(
     "",
-    response_model=PhotoListResponse,
+    responses={200: {"model": PhotoListResponse}},
     summary="List all photos",
     description="Returns a list of all photo panels with metadata."
 )
@@ -28,21 +42,27 @@ async def list_photos(
     offset: int = Query(0, ge=0, description="Number of photos to skip"),
     name: Optional[str] = Query(None, description="Filter by name (partial match)"),
     service: PhotosService = Depends(get_service)
-) -> PhotoListResponse:
+):
     """
     Get list of all photo panels.
     
-    Supports pagination and optional name filtering.
+    Supports pagination and optional name filtering. The photos are
+    already validated by the service, so the response is encoded directly
+    rather than re-validated against a response model.
     """
     photos = await service.list_photos(limit=limit, offset=offset, name=name)
-    return PhotoListResponse(photos=photos, total=len(photos))
+    return _photo_list_response(photos)
 
 
 @router.get(
     "/bbox",
-    response_model=PhotoListResponse,
+    responses={200: {
+        "model": PhotoListResponse,
+        "content": {MVTResponse.media_type: {}}
+    }},
     summary="Get photos in bounding box",
-    description="Returns photos that intersect with the specified bounding box."
+    description="Returns photos that intersect with the specified bounding box, "
+                "as JSON (default) or as a Mapbox Vector Tile with format=mvt."
 )
 async def get_photos_in_bbox(
     min_lng: float = Query(..., description="Minimum longitude (west)", ge=-180, le=180),
@@ -51,13 +71,25 @@ async def get_photos_in_bbox(
     max_lat: float = Query(..., description="Maximum latitude (north)", ge=-90, le=90),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of photos to return"),
     offset: int = Query(0, ge=0, description="Number of photos to skip"),
+    format: Literal["geojson", "mvt"] = Query("geojson", description="Response format"),
     service: PhotosService = Depends(get_service)
-) -> PhotoListResponse:
+):
     """
     Get photos within a bounding box.
     
     Coordinates should be in WGS84 (EPSG:4326).
     """
+    if format == "mvt":
+        tile = await service.get_photos_in_bbox_mvt(
+            min_lng=min_lng,
+            min_lat=min_lat,
+            max_lng=max_lng,
+            max_lat=max_lat,
+            limit=limit,
+            offset=offset
+        )
+        return MVTResponse(content=tile)
+    
     photos = await service.get_photos_in_bbox(
         min_lng=min_lng,
         min_lat=min_lat,
@@ -66,7 +98,7 @@ async def get_photos_in_bbox(
         limit=limit,
         offset=offset
     )
-    return PhotoListResponse(photos=photos, total=len(photos))
+    return _photo_list_response(photos)
 
 
 @router.get(
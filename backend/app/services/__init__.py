@@ -1,8 +1,8 @@
 """
 Service layer for business logic.
 """
-from .geologic_service import GeologicDataService
+from .geologic_service import GeologicDataService, InvalidCursorError
 from .photos_service import PhotosService
 
-__all__ = ["GeologicDataService", "PhotosService"]
+__all__ = ["GeologicDataService", "InvalidCursorError", "PhotosService"]
 
@@ -2,11 +2,64 @@
 Service layer for geologic data operations.
 Encapsulates business logic and database interactions.
 """
-from typing import Dict, List, Optional, Any
+import asyncio
+import hashlib
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Any, Set, Tuple
+from asyncpg.exceptions import DataError, UndefinedTableError
 from databases import Database
 
-from app.models.geologic import FilterParams, TableInfo, GeoJSONFeatureCollection
-from app.utils.query_builder import build_geojson_query, get_table_display_name
+from app.database import fetch_row, fetch_value, iterate_values
+from app.models.geologic import FeatureFilters, TableInfo
+from app.utils.query_builder import (
+    build_geojson_query,
+    build_extent_query,
+    build_features_query,
+    build_mvt_query,
+    build_query_params,
+    build_table_counts_query,
+    get_table_display_name,
+    BBOX_COLUMN,
+    BBOX_COLUMNS,
+    DERIVED_COLUMNS,
+    FILTER_BBOX,
+    TEXT_TYPES,
+    filter_mask,
+    quote_ident,
+    to_positional
+)
+
+
+EMPTY_FEATURE_COLLECTION = b'{"type": "FeatureCollection", "features": []}'
+EMPTY_FEATURE_COLLECTION_ETAG = hashlib.md5(EMPTY_FEATURE_COLLECTION).hexdigest()
+
+# Streamed FeatureCollections are flushed in chunks of roughly this many bytes
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Simplified copies of a table for low zoom levels are named <table>_z<max zoom>
+# (see migrations/003_simplified_views.sql)
+SIMPLIFIED_VIEW_RE = re.compile(r"(.+)_z(\d+)")
+
+# Subdivided pieces of a table's geometries live in <table>_sub
+# (see migrations/005_subdivided_tables.sql)
+SUBDIVIDED_SUFFIX = "_sub"
+
+# Keyset cursors are bound as text and cast to the primary key's type by
+# the query, so they are checked against the key type before the query
+# runs and a malformed cursor is a client error instead of a failed cast
+# (or, on a stream, a truncated body). Integer and text keys are checked
+# here; other key types are cast by Postgres in a query of their own.
+INTEGER_KEY_RANGES = {
+    "smallint": 2 ** 15,
+    "integer": 2 ** 31,
+    "bigint": 2 ** 63,
+}
+INTEGER_CURSOR_RE = re.compile(r"\s*[-+]?\d+\s*")
+
+
+class InvalidCursorError(ValueError):
+    """A keyset pagination cursor that the table cannot be paged by."""
 
 
 class GeologicDataService:
@@ -21,6 +74,9 @@ class GeologicDataService:
         'geography_columns',  # PostGIS system table
     }
     
+    # Seconds before table metadata and SQL templates are reloaded
+    METADATA_TTL = 300
+    
     def __init__(self, database: Database):
         """
         Initialize the service with a database connection.
@@ -29,47 +85,300 @@ class GeologicDataService:
             database: Database instance
         """
         self.db = database
+        self._table_info_cache: Dict[str, TableInfo] = {}
+        # Geometry column, SRID and prebuilt SQL templates per queryable table
+        self._geometry_columns: Dict[str, str] = {}
+        self._srid: Dict[str, int] = {}
+        self._sql: Dict[str, Dict[str, str]] = {}
+        # Positional forms of the collection templates, run as prepared statements
+        self._stmt: Dict[str, Dict[str, Tuple[str, Tuple[str, ...]]]] = {}
+        # Attribute (non-geometry) columns per queryable table
+        self._columns: Dict[str, List[str]] = {}
+        # Per-table keyword arguments for the GeoJSON query builders
+        self._query_options: Dict[str, Dict[str, Any]] = {}
+        # Simplified views per table as (max zoom, view name), ascending
+        self._simplified: Dict[str, List[Tuple[int, str]]] = {}
+        # Auxiliary relations (simplified views, subdivided tables) that are
+        # only read on behalf of their base table
+        self._hidden_tables: Set[str] = set()
+        self._metadata_lock = asyncio.Lock()
+        self._metadata_expires_at = 0.0
+    
+    async def warm(self) -> None:
+        """
+        Populate every cache the request path relies on.
+        
+        Called from the application lifespan so the first request does not
+        pay for table discovery, template building or metadata counts.
+        """
+        await self.refresh_metadata()
+    
+    async def refresh_metadata(self) -> None:
+        """
+        Reload the table metadata and SQL template caches.
+        
+        Concurrent callers share a single reload.
+        """
+        async with self._metadata_lock:
+            if self._metadata_expires_at > time.monotonic():
+                # Another caller refreshed while we waited for the lock
+                return
+            await self.build_sql_cache()
+            await self.load_table_info()
+            self._metadata_expires_at = time.monotonic() + self.METADATA_TTL
+    
+    def invalidate_metadata(self) -> None:
+        """Mark the table metadata as stale so the next request reloads it."""
+        self._metadata_expires_at = 0.0
+    
+    async def _ensure_metadata(self) -> None:
+        """
+        Reload table metadata if its time-to-live has passed.
+        
+        While a reload is running, requests keep using the previous
+        metadata instead of waiting, unless there is none yet.
+        """
+        if self._metadata_expires_at > time.monotonic():
+            return
+        if self._sql and self._metadata_lock.locked():
+            return
+        await self.refresh_metadata()
     
-    async def get_available_tables(self) -> List[TableInfo]:
+    async def build_sql_cache(self) -> None:
+        """
+        Discover queryable tables and prebuild their SQL templates.
+        
+        Every public table registered in geometry_columns gets a template
+        for the unfiltered collection, the streamed feature rows, the
+        bounding box query, the vector tile query and the extent query,
+        with the table's SRID built in. The collection
+        templates are also kept in positional form so they run as prepared
+        statements. The template cache doubles as the allowlist of tables
+        the feature endpoints will query.
+        """
+        # Geometry metadata and the column list come back in one round trip.
+        # Columns are read from pg_attribute rather than
+        # information_schema.columns, which leaves out materialized views
+        # such as the simplified <table>_z<N> copies.
+        query = """
+        SELECT
+            gc.f_table_name,
+            gc.f_geometry_column,
+            gc.srid,
+            array_agg(a.attname::text ORDER BY a.attnum) AS columns,
+            array_agg(format_type(a.atttypid, NULL) ORDER BY a.attnum) AS column_types,
+            pk.column_name AS primary_key,
+            pk.data_type AS primary_key_type
+        FROM geometry_columns gc
+        JOIN pg_attribute a
+            ON a.attrelid = to_regclass(format('%I.%I', gc.f_table_schema, gc.f_table_name))
+            AND a.attnum > 0
+            AND NOT a.attisdropped
+        LEFT JOIN (
+            -- Single-column primary keys, used for ordering and keyset pagination
+            SELECT
+                i.indrelid,
+                a.attname::text AS column_name,
+                format_type(a.atttypid, a.atttypmod) AS data_type
+            FROM pg_index i
+            JOIN pg_attribute a
+                ON a.attrelid = i.indrelid
+                AND a.attnum = i.indkey[0]
+            WHERE i.indisprimary AND i.indnkeyatts = 1
+        ) pk ON pk.indrelid = a.attrelid
+        WHERE gc.f_table_schema = 'public'
+        -- Stored envelopes are registered as geometry columns too
+        AND gc.f_geometry_column <> :bbox_column
+        GROUP BY gc.f_table_name, gc.f_geometry_column, gc.srid, pk.column_name, pk.data_type
+        ORDER BY gc.f_table_name
+        """
+        results = await self.db.fetch_all(query, values={"bbox_column": BBOX_COLUMN})
+        # Overridden envelope columns may be registered as geometry columns too
+        results = [
+            row for row in results
+            if row['f_geometry_column'] != BBOX_COLUMNS.get(row['f_table_name'])
+        ]
+        
+        geometry_columns = {}
+        srids = {}
+        sql = {}
+        stmt = {}
+        attributes = {}
+        query_options = {}
+        hidden_tables = set()
+        rows_by_table = {}
+        for row in results:
+            rows_by_table.setdefault(row['f_table_name'], row)
+        
+        def primary_key_of(row: Any) -> Optional[Tuple[str, str]]:
+            # Materialized views have no primary key of their own, but a
+            # simplified view keeps its base table's key column, so its
+            # pages are ordered and keyset paged the same way
+            if row['primary_key']:
+                return row['primary_key'], row['primary_key_type']
+            match = SIMPLIFIED_VIEW_RE.fullmatch(row['f_table_name'])
+            base_row = rows_by_table.get(match.group(1)) if match else None
+            if (
+                base_row and base_row['primary_key']
+                and base_row['primary_key'] in (row['columns'] or ())
+            ):
+                return base_row['primary_key'], base_row['primary_key_type']
+            return None
+        
+        for row in results:
+            table_name = row['f_table_name']
+            if table_name in self.EXCLUDED_TABLES or table_name in geometry_columns:
+                continue
+            
+            geometry_column = row['f_geometry_column']
+            srid = row['srid'] or 4326
+            columns = tuple(row['columns'] or ())
+            bbox_column = BBOX_COLUMNS.get(table_name)
+            if bbox_column not in columns:
+                bbox_column = None
+            filter_columns = (DERIVED_COLUMNS | {bbox_column}) if bbox_column else DERIVED_COLUMNS
+            geometry_columns[table_name] = geometry_column
+            srids[table_name] = srid
+            attributes[table_name] = [
+                column for column in columns
+                if column != geometry_column and column not in filter_columns
+            ]
+            # Subdivided pieces are joined back on the primary key, so they
+            # must carry it and keep the geometry column's name
+            subdivided = table_name + SUBDIVIDED_SUFFIX
+            sub_row = rows_by_table.get(subdivided)
+            if not (
+                sub_row and row['primary_key']
+                and sub_row['f_geometry_column'] == geometry_column
+                and row['primary_key'] in (sub_row['columns'] or ())
+            ):
+                subdivided = None
+            else:
+                hidden_tables.add(subdivided)
+            
+            options = query_options[table_name] = {
+                "srid": srid,
+                # Filter-only columns are left out by listing the properties explicitly
+                "properties": (
+                    tuple(attributes[table_name])
+                    if filter_columns.intersection(columns) else None
+                ),
+                "columns": columns,
+                "primary_key": primary_key_of(row),
+                "subdivided": subdivided,
+                "column_types": tuple(zip(columns, row['column_types'] or ())),
+                "bbox_column": bbox_column,
+            }
+            sql[table_name] = {
+                "geojson": build_geojson_query(
+                    table_name, geometry_column, FeatureFilters(), **options
+                )[0],
+                "features": build_features_query(
+                    table_name, geometry_column, FeatureFilters(), **options
+                )[0],
+                "bbox": build_geojson_query(
+                    table_name, geometry_column, FeatureFilters(bbox=(0, 0, 0, 0)), **options
+                )[0],
+            }
+            stmt[table_name] = {
+                kind: to_positional(sql[table_name][kind])
+                for kind in ("geojson", "bbox")
+            }
+            sql[table_name]["mvt"] = build_mvt_query(
+                table_name, geometry_column, attributes[table_name], srid
+            )
+            sql[table_name]["extent"] = build_extent_query(
+                table_name, geometry_column, srid, columns, bbox_column
+            )
+        
+        self._geometry_columns = geometry_columns
+        self._srid = srids
+        self._sql = sql
+        self._stmt = stmt
+        self._columns = attributes
+        self._query_options = query_options
+        
+        # Simplified views get templates like any table, but are only
+        # reachable through the zoom filter of their base table
+        simplified: Dict[str, List[Tuple[int, str]]] = {}
+        for name in sql:
+            match = SIMPLIFIED_VIEW_RE.fullmatch(name)
+            if match and match.group(1) in sql:
+                simplified.setdefault(match.group(1), []).append((int(match.group(2)), name))
+        for views in simplified.values():
+            views.sort()
+            hidden_tables.update(name for _, name in views)
+        self._simplified = simplified
+        self._hidden_tables = hidden_tables
+    
+    async def get_available_tables(self, exact_count: bool = False) -> List[TableInfo]:
         """
         Get list of all available geologic data tables.
         
+        Served from the table metadata cache, which is reloaded every
+        METADATA_TTL seconds. Its feature counts are the planner's estimates;
+        with exact_count, every table is counted in one query instead.
+        
+        Args:
+            exact_count: Replace the estimated feature counts with exact ones
+            
         Returns:
             List of TableInfo objects
         """
-        # Build excluded tables list for SQL
-        excluded_list = ', '.join([f"'{table}'" for table in self.EXCLUDED_TABLES])
+        await self._ensure_metadata()
+        tables = list(self._table_info_cache.values())
+        if not exact_count or not tables:
+            return tables
+        
+        counts = await self._count_tables([table.name for table in tables])
+        return [
+            table.model_copy(update={"feature_count": counts[table.name]})
+            if table.name in counts else table
+            for table in tables
+        ]
+    
+    async def load_table_info(self) -> None:
+        """
+        Load metadata for all available tables into the table info cache.
         
-        query = f"""
+        Called at application startup and whenever the metadata expires;
+        in between, table lookups are plain dictionary reads.
+        """
+        # Feature counts use the planner's row estimate from pg_class, so the
+        # whole listing is one query instead of a COUNT(*) scan per table
+        query = """
         SELECT 
             t.table_name,
             gc.type as geometry_type,
-            (SELECT COUNT(*) FROM information_schema.columns 
-             WHERE table_name = t.table_name AND table_schema = 'public') as column_count
+            c.reltuples::bigint as estimated_count
         FROM information_schema.tables t
         LEFT JOIN geometry_columns gc 
             ON gc.f_table_name = t.table_name 
             AND gc.f_table_schema = 'public'
+            AND gc.f_geometry_column <> :bbox_column
+        LEFT JOIN pg_class c
+            ON c.oid = to_regclass(format('%I.%I', t.table_schema, t.table_name))
         WHERE t.table_schema = 'public' 
         AND t.table_type = 'BASE TABLE'
-        AND t.table_name NOT IN ({excluded_list})
+        AND t.table_name::text <> ALL(:excluded)
         ORDER BY t.table_name;
         """
         
-        results = await self.db.fetch_all(query)
+        results = await self.db.fetch_all(
+            query,
+            values={"excluded": sorted(self.EXCLUDED_TABLES), "bbox_column": BBOX_COLUMN}
+        )
+        
+        # Auxiliary tables are not listed on their own
+        results = [row for row in results if row['table_name'] not in self._hidden_tables]
         
         tables = []
         for row in results:
             table_name = row['table_name']
-            
-            # Get feature count
-            try:
-                count_result = await self.db.fetch_one(
-                    f'SELECT COUNT(*) as count FROM "{table_name}"'
-                )
-                feature_count = count_result['count'] if count_result else 0
-            except Exception:
-                feature_count = 0
+            # Tables that have never been analyzed report -1 and are listed
+            # with 0 features rather than counted on every reload;
+            # exact_count gives their real size
+            feature_count = max(row['estimated_count'] or 0, 0)
             
             tables.append(TableInfo(
                 name=table_name,
@@ -78,81 +387,299 @@ class GeologicDataService:
                 geometry_type=row['geometry_type']
             ))
         
-        return tables
+        self._table_info_cache = {table.name: table for table in tables}
+    
+    async def _count_tables(self, table_names: List[str]) -> Dict[str, int]:
+        """
+        Count the rows of several tables exactly, in one query.
+        
+        Args:
+            table_names: Names of the tables
+            
+        Returns:
+            Dictionary of table name to row count
+        """
+        results = await self.db.fetch_all(build_table_counts_query(table_names))
+        return {row['table_name']: row['feature_count'] for row in results}
+    
+    async def _count_rows(self, table_name: str) -> Optional[int]:
+        """
+        Count the rows of a table exactly.
+        
+        Args:
+            table_name: Name of the table
+            
+        Returns:
+            Row count, or None if the table cannot be queried
+        """
+        try:
+            count_result = await self.db.fetch_one(
+                f'SELECT COUNT(*) as count FROM {quote_ident(table_name)}'
+            )
+        except Exception:
+            return None
+        return count_result['count'] if count_result else 0
     
     async def get_features_geojson(
         self,
         table_name: str,
-        filters: Optional[FilterParams] = None
-    ) -> Dict[str, Any]:
+        filters: Optional[FeatureFilters] = None
+    ) -> Tuple[bytes, str]:
         """
         Get features from a table as GeoJSON.
         
+        The FeatureCollection text built by PostGIS is returned as bytes
+        ready for the response body; it is never decoded into Python objects.
+        PostGIS also hashes it, for use as an ETag.
+        
         Args:
             table_name: Name of the table to query
             filters: Optional filter parameters
             
         Returns:
-            GeoJSON FeatureCollection as dict
+            Tuple of (GeoJSON FeatureCollection as UTF-8 encoded JSON, md5 hex
+            digest of the body)
             
         Raises:
             ValueError: If table doesn't exist or is excluded
+            InvalidCursorError: If filters.after is set for a table without a
+                primary key or is not a valid value of its type
         """
-        # Validate table exists and is not excluded
-        if table_name in self.EXCLUDED_TABLES:
-            raise ValueError(f"Table '{table_name}' is not accessible")
+        filters = filters or FeatureFilters(limit=100)
+        await self._get_table_sql(table_name)
+        await self._check_cursor(table_name, filters)
+        table_name = self._source_table(table_name, filters)
         
-        # Check if table exists
-        table_check = await self.db.fetch_one(
-            """
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name = :table_name
-            """,
-            values={"table_name": table_name}
-        )
+        if filter_mask(filters) & ~FILTER_BBOX:
+            # Build a query for this particular combination of filters
+            query, params = build_geojson_query(
+                table_name=table_name,
+                geometry_column=self._geometry_columns[table_name],
+                filters=filters,
+                **self._query_options[table_name]
+            )
+            query, names = to_positional(query)
+        else:
+            query, names = self._stmt[table_name]["bbox" if filters.bbox else "geojson"]
+            params = build_query_params(filters)
         
-        if not table_check:
+        try:
+            row = await fetch_row(query, *(params[name] for name in names))
+        except UndefinedTableError:
+            # Dropped since the table cache was built
             raise ValueError(f"Table '{table_name}' does not exist")
         
-        # Determine geometry column name
-        geom_col_query = """
-        SELECT f_geometry_column 
-        FROM geometry_columns 
-        WHERE f_table_schema = 'public' 
-        AND f_table_name = :table_name
-        LIMIT 1
+        if row and row['geojson']:
+            return row['geojson'].encode(), row['etag']
+        
+        # Return empty FeatureCollection if no results
+        return EMPTY_FEATURE_COLLECTION, EMPTY_FEATURE_COLLECTION_ETAG
+    
+    async def stream_features_geojson(
+        self,
+        table_name: str,
+        filters: Optional[FeatureFilters] = None
+    ) -> AsyncIterator[bytes]:
         """
-        geom_result = await self.db.fetch_one(
-            geom_col_query,
-            values={"table_name": table_name}
-        )
+        Get features from a table as a streamed GeoJSON FeatureCollection.
         
-        geometry_column = geom_result['f_geometry_column'] if geom_result else 'geometry'
+        The table is validated before returning, so errors surface before
+        any data is sent. Rows are then read through a server-side cursor
+        and only one chunk is held in memory at a time.
         
-        # Build and execute query
-        query, params = build_geojson_query(
-            table_name=table_name,
-            geometry_column=geometry_column,
-            filters=filters
-        )
+        Args:
+            table_name: Name of the table to query
+            filters: Optional filter parameters
+            
+        Returns:
+            Async iterator of encoded FeatureCollection chunks
+            
+        Raises:
+            ValueError: If table doesn't exist or is excluded
+            InvalidCursorError: If filters.after is set for a table without a
+                primary key or is not a valid value of its type
+        """
+        filters = filters or FeatureFilters(limit=100)
+        await self._get_table_sql(table_name)
+        await self._check_cursor(table_name, filters)
+        table_name = self._source_table(table_name, filters)
+        templates = self._sql[table_name]
         
-        result = await self.db.fetch_one(query, values=params)
+        if filter_mask(filters):
+            query, params = build_features_query(
+                table_name=table_name,
+                geometry_column=self._geometry_columns[table_name],
+                filters=filters,
+                **self._query_options[table_name]
+            )
+        else:
+            query = templates["features"]
+            params = build_query_params(filters)
         
-        if result and result['geojson']:
-            geojson_data = result['geojson']
-            # If it's a string, parse it; otherwise return as-is
-            if isinstance(geojson_data, str):
-                import json
-                return json.loads(geojson_data)
-            return geojson_data
+        return self._iter_feature_collection(query, params)
+    
+    async def get_features_mvt(self, table_name: str, z: int, x: int, y: int) -> bytes:
+        """
+        Get the features of one web map tile as a Mapbox Vector Tile.
         
-        # Return empty FeatureCollection if no results
-        return {
-            "type": "FeatureCollection",
-            "features": []
-        }
+        Args:
+            table_name: Name of the table to query
+            z: Zoom level
+            x: Tile column
+            y: Tile row
+            
+        Returns:
+            Encoded vector tile (empty if no features intersect the tile)
+            
+        Raises:
+            ValueError: If table doesn't exist or is excluded
+        """
+        templates = await self._get_table_sql(table_name)
+        try:
+            tile = await fetch_value(templates["mvt"], z, x, y)
+        except UndefinedTableError:
+            raise ValueError(f"Table '{table_name}' does not exist")
+        return bytes(tile) if tile else b""
+    
+    async def get_table_extent(
+        self,
+        table_name: str
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Get the bounding box of every feature in a table.
+        
+        Args:
+            table_name: Name of the table to query
+            
+        Returns:
+            Tuple of (min_lng, min_lat, max_lng, max_lat) in WGS84, or None
+            if the table has no geometries
+            
+        Raises:
+            ValueError: If table doesn't exist or is excluded
+        """
+        templates = await self._get_table_sql(table_name)
+        try:
+            row = await fetch_row(templates["extent"])
+        except UndefinedTableError:
+            raise ValueError(f"Table '{table_name}' does not exist")
+        
+        if row is None or row['min_lng'] is None:
+            return None
+        return row['min_lng'], row['min_lat'], row['max_lng'], row['max_lat']
+    
+    async def _iter_feature_collection(
+        self,
+        query: str,
+        params: Dict[str, Any]
+    ) -> AsyncIterator[bytes]:
+        """
+        Wrap per-row Feature text from a cursor in a FeatureCollection.
+        
+        Features are encoded and flushed as the cursor yields them, so
+        memory use does not grow with the size of the table.
+        """
+        chunk = [b'{"type": "FeatureCollection", "features": [']
+        size = 0
+        separator = b""
+        
+        query, names = to_positional(query)
+        async for feature_json in iterate_values(query, *(params[name] for name in names)):
+            feature = separator + feature_json.encode()
+            chunk.append(feature)
+            size += len(feature)
+            separator = b","
+            
+            if size >= STREAM_CHUNK_SIZE:
+                yield b"".join(chunk)
+                chunk = []
+                size = 0
+        
+        chunk.append(b"]}")
+        yield b"".join(chunk)
+    
+    async def _get_table_sql(self, table_name: str) -> Dict[str, str]:
+        """
+        Get the prebuilt SQL templates for a table.
+        
+        Args:
+            table_name: Name of the table
+            
+        Returns:
+            Dict of SQL templates keyed by query shape
+            
+        Raises:
+            ValueError: If table doesn't exist or is excluded
+        """
+        if table_name in self.EXCLUDED_TABLES:
+            raise ValueError(f"Table '{table_name}' is not accessible")
+        
+        await self._ensure_metadata()
+        
+        templates = self._sql.get(table_name)
+        if templates is None or table_name in self._hidden_tables:
+            raise ValueError(f"Table '{table_name}' does not exist")
+        return templates
+    
+    async def _check_cursor(self, table_name: str, filters: FeatureFilters) -> None:
+        """
+        Check a keyset pagination cursor against the table's primary key type.
+        
+        Args:
+            table_name: Name of a validated table
+            filters: Filter parameters of the request
+            
+        Raises:
+            InvalidCursorError: If filters.after is set for a table without a
+                primary key or is not a valid value of the key type
+        """
+        if filters.after is None:
+            return
+        primary_key = self._query_options[table_name]["primary_key"]
+        if primary_key is None:
+            raise InvalidCursorError(f"Table '{table_name}' has no primary key to page by")
+        
+        key_type = primary_key[1]
+        # Drop any type modifier, as in character varying(20)
+        base_type = key_type.split("(")[0]
+        after = filters.after
+        if "\x00" in after:
+            # Postgres text cannot hold NUL characters
+            valid = False
+        elif base_type in INTEGER_KEY_RANGES:
+            limit = INTEGER_KEY_RANGES[base_type]
+            valid = bool(INTEGER_CURSOR_RE.fullmatch(after)) and -limit <= int(after) < limit
+        elif base_type in TEXT_TYPES:
+            valid = True
+        else:
+            try:
+                await fetch_value(f"SELECT CAST(CAST($1 AS text) AS {key_type})", after)
+                valid = True
+            except DataError:
+                valid = False
+        
+        if not valid:
+            raise InvalidCursorError(
+                f"Invalid cursor '{after}' for the {base_type} primary key of table '{table_name}'"
+            )
+    
+    def _source_table(self, table_name: str, filters: FeatureFilters) -> str:
+        """
+        Pick the relation to read a table's features from.
+        
+        Args:
+            table_name: Name of a validated table
+            filters: Filter parameters of the request
+            
+        Returns:
+            The least simplified view covering filters.zoom, or the table
+            itself if there is none
+        """
+        if filters.zoom is not None:
+            for max_zoom, view in self._simplified.get(table_name, ()):
+                if filters.zoom <= max_zoom:
+                    return view
+        return table_name
     
     async def get_table_info(self, table_name: str) -> Optional[TableInfo]:
         """
@@ -167,25 +694,30 @@ class GeologicDataService:
         if table_name in self.EXCLUDED_TABLES:
             return None
         
-        # Get geometry type
+        await self._ensure_metadata()
+        info = self._table_info_cache.get(table_name)
+        if info:
+            return info
+        if table_name in self._hidden_tables:
+            return None
+        
+        # Geometry type and feature count are independent, so fetch both at once
         geom_query = """
         SELECT type as geometry_type
         FROM geometry_columns
         WHERE f_table_schema = 'public'
         AND f_table_name = :table_name
+        AND f_geometry_column <> :bbox_column
         """
-        geom_result = await self.db.fetch_one(
-            geom_query,
-            values={"table_name": table_name}
+        geom_result, feature_count = await asyncio.gather(
+            self.db.fetch_one(
+                geom_query,
+                values={"table_name": table_name, "bbox_column": BBOX_COLUMN}
+            ),
+            self._count_rows(table_name)
         )
         
-        # Get feature count
-        try:
-            count_result = await self.db.fetch_one(
-                f'SELECT COUNT(*) as count FROM "{table_name}"'
-            )
-            feature_count = count_result['count'] if count_result else 0
-        except Exception:
+        if feature_count is None:
             return None
         
         return TableInfo(
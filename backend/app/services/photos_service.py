@@ -4,9 +4,87 @@ Provides specialized access to photo_panels table.
 """
 from typing import Dict, List, Optional, Any
 from databases import Database
-import json
+import orjson
 
+from app.database import fetch_value
 from app.models.photos import PhotoInfo, PhotoDetailResponse
+from app.utils.cache import TTLCache
+from app.utils.query_builder import build_jsonb_object
+
+
+PHOTO_PANELS_TABLE = "photo_panels"
+
+# Constant SQL, built once at import time
+GEOMETRY_COLUMN_SQL = """
+SELECT f_geometry_column 
+FROM geometry_columns 
+WHERE f_table_schema = 'public' 
+AND f_table_name = :table_name
+LIMIT 1
+"""
+
+PROPERTY_COLUMNS_SQL = """
+SELECT column_name
+FROM information_schema.columns
+WHERE table_schema = 'public'
+AND table_name = :table_name
+AND column_name <> :geom_col
+ORDER BY ordinal_position
+"""
+
+STORAGE_URLS_SQL = 'SELECT "filename", "url" FROM "photos"'
+
+STORAGE_URL_BY_NAME_SQL = 'SELECT "url" FROM "photos" WHERE "filename" = :name LIMIT 1'
+
+PANEL_URLS_SQL = f'SELECT "ID" as id, "Hyperlink" as hyperlink FROM "{PHOTO_PANELS_TABLE}"'
+
+PANEL_URL_BY_ID_SQL = (
+    f'SELECT "Hyperlink" as hyperlink FROM "{PHOTO_PANELS_TABLE}" WHERE "ID" = :photo_id LIMIT 1'
+)
+
+ESTIMATED_COUNT_SQL = (
+    "SELECT reltuples::bigint as count FROM pg_class "
+    f"WHERE oid = to_regclass('public.\"{PHOTO_PANELS_TABLE}\"')"
+)
+
+COUNT_SQL = f'SELECT COUNT(*) as count FROM "{PHOTO_PANELS_TABLE}"'
+
+# ILIKE can use the trigram indexes from migrations/001
+NAME_FILTER_SQL = 'WHERE "NAME" ILIKE :name_pattern OR "PM_NAME" ILIKE :name_pattern'
+
+# Aggregates one page of photo rows into a single JSON array
+PHOTO_LIST_SQL_TEMPLATE = """
+SELECT COALESCE(jsonb_agg(photo ORDER BY photo_id), '[]'::jsonb)::text AS photos
+FROM (
+    {base_select}
+    {where_clause}
+    ORDER BY "ID"
+    LIMIT :limit OFFSET :offset
+) p
+"""
+
+# Vector tile of the photos in a bounding box ($1-$4), paged by $5/$6
+PHOTO_MVT_SQL_TEMPLATE = """
+WITH bounds AS (
+    SELECT ST_MakeEnvelope($1, $2, $3, $4, 4326) AS geom
+)
+SELECT ST_AsMVT(mvt, 'photos', 4096, 'mvt_geom') AS tile
+FROM (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(p."{geom_col}", 3857),
+            ST_Transform(bounds.geom, 3857),
+            4096, 64, true
+        ) AS mvt_geom,
+        p."ID" as id,
+        COALESCE(p."NAME", p."PM_NAME", 'Unknown') as name,
+        p."Hyperlink" as hyperlink
+    FROM "{table}" p, bounds
+    WHERE ST_Intersects(p."{geom_col}", bounds.geom)
+    ORDER BY p."ID"
+    LIMIT $5 OFFSET $6
+) mvt
+"""
 
 
 class PhotosService:
@@ -14,7 +92,11 @@ class PhotosService:
     Service for handling photo panel queries and operations.
     """
     
-    TABLE_NAME = "photo_panels"
+    TABLE_NAME = PHOTO_PANELS_TABLE
+    
+    # Photo detail lookups are cached per ID
+    DETAIL_CACHE_SIZE = 1024
+    DETAIL_CACHE_TTL = 300
     
     def __init__(self, database: Database):
         """
@@ -24,18 +106,144 @@ class PhotosService:
             database: Database instance
         """
         self.db = database
+        # Photo URLs keyed by storage filename and by photo panel ID
+        self._name_to_url: Dict[str, str] = {}
+        self._id_to_url: Dict[int, str] = {}
+        self._urls_loaded = False
+        # Geometry column and non-geometry columns of photo_panels, resolved once
+        self._geom_col: Optional[str] = None
+        self._property_columns: Optional[List[str]] = None
+        self._detail_cache = TTLCache(
+            maxsize=self.DETAIL_CACHE_SIZE,
+            ttl=self.DETAIL_CACHE_TTL
+        )
+        # Query text built once the table metadata is known
+        self._base_select: Optional[str] = None
+        self._detail_query: Optional[str] = None
+        self._list_queries: Dict[str, str] = {}
+        self._mvt_query: Optional[str] = None
+    
+    async def warm(self) -> None:
+        """
+        Populate every cache the request path relies on.
+        
+        Called from the application lifespan before the first request.
+        """
+        await self.initialize()
+        await self.load_photo_urls()
+    
+    async def initialize(self) -> None:
+        """
+        Resolve the table metadata and build the query text used per request.
+        
+        Every list query shares one SELECT body with the geometry column
+        substituted in, and the full text of each list variant is built
+        here once, so requests only pick a query and bind parameters. The
+        number of distinct SQL texts stays small for the asyncpg statement
+        cache.
+        """
+        if self._base_select is not None:
+            return
+        
+        geom_col = await self.get_geometry_column()
+        properties = build_jsonb_object(await self.get_property_columns(), "t")
+        
+        self._detail_query = f"""
+        SELECT {self._photo_json(geom_col, f"'properties', {properties}")}::text as photo
+        FROM "{self.TABLE_NAME}" t
+        WHERE "ID" = $1
+        """
+        self._base_select = f"""
+            SELECT "ID" as photo_id, {self._photo_json(geom_col)} as photo
+            FROM "{self.TABLE_NAME}"
+        """
+        bbox_filter = f"""
+            WHERE ST_Intersects(
+                "{geom_col}",
+                ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)
+            )
+        """
+        self._list_queries = {
+            kind: PHOTO_LIST_SQL_TEMPLATE.format(
+                base_select=self._base_select,
+                where_clause=where_clause
+            )
+            for kind, where_clause in (
+                ("all", ""),
+                ("name", NAME_FILTER_SQL),
+                ("bbox", bbox_filter)
+            )
+        }
+        self._mvt_query = PHOTO_MVT_SQL_TEMPLATE.format(
+            geom_col=geom_col,
+            table=self.TABLE_NAME
+        )
+    
+    def invalidate(self) -> None:
+        """Drop all cached photo metadata so it is reloaded on next use."""
+        self._geom_col = None
+        self._property_columns = None
+        self._base_select = None
+        self._detail_query = None
+        self._list_queries = {}
+        self._mvt_query = None
+        self._urls_loaded = False
+        self._detail_cache.clear()
+    
+    async def load_photo_urls(self) -> None:
+        """
+        Load all photo URLs into memory.
+        
+        Called at application startup so URL lookups never hit the database.
+        """
+        storage_rows = await self.db.fetch_all(STORAGE_URLS_SQL)
+        panel_rows = await self.db.fetch_all(PANEL_URLS_SQL)
+        
+        self._name_to_url = {
+            row['filename']: row['url']
+            for row in storage_rows
+            if row['filename'] and row['url']
+        }
+        self._id_to_url = {
+            row['id']: self._build_photo_url(row['hyperlink'])
+            for row in panel_rows
+            if row['hyperlink']
+        }
+        self._urls_loaded = True
     
     async def get_geometry_column(self) -> str:
-        """Get the geometry column name for photo_panels table."""
-        query = """
-        SELECT f_geometry_column 
-        FROM geometry_columns 
-        WHERE f_table_schema = 'public' 
-        AND f_table_name = :table_name
-        LIMIT 1
-        """
-        result = await self.db.fetch_one(query, values={"table_name": self.TABLE_NAME})
-        return result['f_geometry_column'] if result else 'geometry'
+        """
+        Get the geometry column name for photo_panels table.
+        
+        The column is looked up once and cached, since table metadata does
+        not change while the application is running.
+        """
+        if self._geom_col is not None:
+            return self._geom_col
+        
+        result = await self.db.fetch_one(
+            GEOMETRY_COLUMN_SQL,
+            values={"table_name": self.TABLE_NAME}
+        )
+        self._geom_col = result['f_geometry_column'] if result else 'geometry'
+        return self._geom_col
+    
+    async def get_property_columns(self) -> List[str]:
+        """
+        Get the non-geometry column names of photo_panels table.
+        
+        Looked up once and cached, like the geometry column.
+        """
+        if self._property_columns is not None:
+            return self._property_columns
+        
+        geom_col = await self.get_geometry_column()
+        results = await self.db.fetch_all(
+            PROPERTY_COLUMNS_SQL,
+            values={"table_name": self.TABLE_NAME, "geom_col": geom_col}
+        )
+        self._property_columns = [row['column_name'] for row in results]
+        return self._property_columns
     
     async def list_photos(
         self,
@@ -54,106 +262,52 @@ class PhotosService:
         Returns:
             List of PhotoInfo objects
         """
-        geom_col = await self.get_geometry_column()
-        
-        where_clause = ""
+        kind = "all"
         params = {"limit": limit, "offset": offset}
         
         if name:
-            where_clause = 'WHERE LOWER("NAME") LIKE LOWER(:name_pattern) OR LOWER("PM_NAME") LIKE LOWER(:name_pattern)'
+            kind = "name"
             params["name_pattern"] = f"%{name}%"
         
-        query = f"""
-        SELECT 
-            "ID" as id,
-            COALESCE("NAME", "PM_NAME", 'Unknown') as name,
-            "Hyperlink" as hyperlink,
-            "MAPSYMBOL" as map_symbol,
-            "STRAT_INTE" as strat_interval,
-            "FEATURETYP" as feature_type,
-            "LENGTH" as length,
-            ST_AsGeoJSON("{geom_col}")::json as geometry
-        FROM "{self.TABLE_NAME}"
-        {where_clause}
-        ORDER BY "ID"
-        LIMIT :limit OFFSET :offset
-        """
-        
-        results = await self.db.fetch_all(query, values=params)
-        
-        photos = []
-        for row in results:
-            # Parse geometry if it's a string
-            geometry = row['geometry']
-            if isinstance(geometry, str):
-                geometry = json.loads(geometry)
-            
-            photos.append(PhotoInfo(
-                id=row['id'],
-                name=row['name'] or 'Unknown',
-                hyperlink=row['hyperlink'],
-                map_symbol=row['map_symbol'],
-                strat_interval=row['strat_interval'],
-                feature_type=row['feature_type'],
-                length=row['length'],
-                geometry=geometry
-            ))
-        
-        return photos
+        return await self._fetch_photo_list(kind, params)
     
     async def get_photo_by_id(self, photo_id: int) -> Optional[PhotoDetailResponse]:
         """
         Get detailed information about a specific photo.
         
+        Repeat lookups of the same ID are served from an in-memory cache;
+        IDs that are not found are not cached.
+        
         Args:
             photo_id: The photo ID
             
         Returns:
             PhotoDetailResponse or None if not found
         """
-        geom_col = await self.get_geometry_column()
-        
-        query = f"""
-        SELECT 
-            "ID" as id,
-            COALESCE("NAME", "PM_NAME", 'Unknown') as name,
-            "Hyperlink" as hyperlink,
-            "MAPSYMBOL" as map_symbol,
-            "STRAT_INTE" as strat_interval,
-            "FEATURETYP" as feature_type,
-            "LENGTH" as length,
-            ST_AsGeoJSON("{geom_col}")::json as geometry,
-            row_to_json(t.*)::jsonb - '{geom_col}' as properties
-        FROM "{self.TABLE_NAME}" t
-        WHERE "ID" = :photo_id
+        return await self._detail_cache.get_or_set(
+            photo_id,
+            lambda: self._fetch_photo_by_id(photo_id)
+        )
+    
+    async def _fetch_photo_by_id(self, photo_id: int) -> Optional[PhotoDetailResponse]:
         """
+        Query the details of a specific photo from the database.
         
-        result = await self.db.fetch_one(query, values={"photo_id": photo_id})
+        The query text is the same for every ID, so it runs on the raw
+        asyncpg connection as a statement prepared once per connection.
+        """
+        await self.initialize()
+        result = await fetch_value(self._detail_query, photo_id)
         
         if not result:
             return None
         
-        # Parse properties if it's a string
-        properties = result['properties']
-        if isinstance(properties, str):
-            properties = json.loads(properties)
-        
-        # Parse geometry if it's a string
-        geometry = result['geometry']
-        if isinstance(geometry, str):
-            geometry = json.loads(geometry)
-        
+        # The whole row arrives as one JSON document, decoded once
+        photo = orjson.loads(result)
+        photo['properties'] = photo['properties'] or {}
         return PhotoDetailResponse(
-            id=result['id'],
-            name=result['name'] or 'Unknown',
-            hyperlink=result['hyperlink'],
-            full_url=self._build_photo_url(result['hyperlink']),
-            map_symbol=result['map_symbol'],
-            strat_interval=result['strat_interval'],
-            feature_type=result['feature_type'],
-            length=result['length'],
-            geometry=geometry,
-            properties=properties or {}
+            full_url=self._build_photo_url(photo['hyperlink']),
+            **photo
         )
     
     async def get_photos_in_bbox(
@@ -179,27 +333,6 @@ class PhotosService:
         Returns:
             List of PhotoInfo objects
         """
-        geom_col = await self.get_geometry_column()
-        
-        query = f"""
-        SELECT 
-            "ID" as id,
-            COALESCE("NAME", "PM_NAME", 'Unknown') as name,
-            "Hyperlink" as hyperlink,
-            "MAPSYMBOL" as map_symbol,
-            "STRAT_INTE" as strat_interval,
-            "FEATURETYP" as feature_type,
-            "LENGTH" as length,
-            ST_AsGeoJSON("{geom_col}")::json as geometry
-        FROM "{self.TABLE_NAME}"
-        WHERE ST_Intersects(
-            "{geom_col}",
-            ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)
-        )
-        ORDER BY "ID"
-        LIMIT :limit OFFSET :offset
-        """
-        
         params = {
             "min_lng": min_lng,
             "min_lat": min_lat,
@@ -209,50 +342,118 @@ class PhotosService:
             "offset": offset
         }
         
-        results = await self.db.fetch_all(query, values=params)
+        return await self._fetch_photo_list("bbox", params)
+    
+    async def get_photos_in_bbox_mvt(
+        self,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        limit: int = 100,
+        offset: int = 0
+    ) -> bytes:
+        """
+        Get photos within a bounding box as a Mapbox Vector Tile.
+        
+        The tile covers exactly the bounding box and carries the id, name
+        and hyperlink of each photo, so map clients can decode geometry
+        without parsing GeoJSON.
+        
+        Args:
+            min_lng: Minimum longitude (west)
+            min_lat: Minimum latitude (south)
+            max_lng: Maximum longitude (east)
+            max_lat: Maximum latitude (north)
+            limit: Maximum number of photos to return
+            offset: Number of photos to skip
+            
+        Returns:
+            Encoded vector tile with a single "photos" layer
+        """
+        await self.initialize()
+        tile = await fetch_value(
+            self._mvt_query, min_lng, min_lat, max_lng, max_lat, limit, offset
+        )
+        return bytes(tile) if tile else b""
+    
+    def _photo_json(self, geom_col: str, *extra: str) -> str:
+        """
+        Build the jsonb expression for one photo panel row.
+        
+        Args:
+            geom_col: Geometry column name
+            *extra: Additional 'key', value pairs to include
+            
+        Returns:
+            SQL jsonb_build_object expression with the PhotoInfo fields
+        """
+        fields = [
+            "'id', \"ID\"",
+            "'name', COALESCE(\"NAME\", \"PM_NAME\", 'Unknown')",
+            "'hyperlink', \"Hyperlink\"",
+            "'map_symbol', \"MAPSYMBOL\"",
+            "'strat_interval', \"STRAT_INTE\"",
+            "'feature_type', \"FEATURETYP\"",
+            "'length', \"LENGTH\"",
+            f"'geometry', ST_AsGeoJSON(\"{geom_col}\")::jsonb",
+            *extra
+        ]
+        return f"jsonb_build_object({', '.join(fields)})"
+    
+    async def _fetch_photo_list(self, kind: str, params: Dict[str, Any]) -> List[PhotoInfo]:
+        """
+        Run a photo list query that aggregates its rows into one JSON array.
+        
+        Decoding a single document is much cheaper than decoding the
+        geometry of every row separately. The rows are built in SQL with
+        exactly the PhotoInfo fields, so they skip model validation; the
+        router then encodes them with pydantic-core rather than walking
+        them in Python.
         
-        photos = []
-        for row in results:
-            # Parse geometry if it's a string
-            geometry = row['geometry']
-            if isinstance(geometry, str):
-                geometry = json.loads(geometry)
+        Args:
+            kind: Prebuilt list query to run ("all", "name" or "bbox")
+            params: Bind parameters, including limit and offset
             
-            photos.append(PhotoInfo(
-                id=row['id'],
-                name=row['name'] or 'Unknown',
-                hyperlink=row['hyperlink'],
-                map_symbol=row['map_symbol'],
-                strat_interval=row['strat_interval'],
-                feature_type=row['feature_type'],
-                length=row['length'],
-                geometry=geometry
-            ))
-        
-        return photos
+        Returns:
+            List of PhotoInfo objects
+        """
+        await self.initialize()
+        result = await self.db.fetch_one(self._list_queries[kind], values=params)
+        if not result or not result['photos']:
+            return []
+        return [
+            PhotoInfo.model_construct(**photo)
+            for photo in orjson.loads(result['photos'])
+        ]
     
     async def get_photo_url(self, photo_id: int) -> Optional[str]:
         """
         Get the URL/hyperlink for a specific photo.
         
+        Served from the URL map loaded at startup. IDs missing from the map
+        (e.g. panels added since) are looked up individually and added to it.
+        
         Args:
             photo_id: The photo ID
             
         Returns:
             Photo URL/filename or None if not found
         """
-        query = f"""
-        SELECT "Hyperlink" as hyperlink
-        FROM "{self.TABLE_NAME}"
-        WHERE "ID" = :photo_id
-        """
+        if not self._urls_loaded:
+            await self.load_photo_urls()
         
-        result = await self.db.fetch_one(query, values={"photo_id": photo_id})
+        url = self._id_to_url.get(photo_id)
+        if url is not None:
+            return url
         
-        if not result or not result['hyperlink']:
+        result = await self.db.fetch_one(PANEL_URL_BY_ID_SQL, values={"photo_id": photo_id})
+        url = self._build_photo_url(result['hyperlink']) if result else None
+        if url is None:
             return None
         
-        return self._build_photo_url(result['hyperlink'])
+        self._id_to_url[photo_id] = url
+        return url
     
     def _build_photo_url(self, hyperlink: Optional[str]) -> Optional[str]:
         """
@@ -278,24 +479,52 @@ class PhotosService:
         # TODO: Configure base URL for photo storage when known
         return hyperlink
     
-    async def get_total_count(self) -> int:
-        """Get total number of photos."""
-        query = f'SELECT COUNT(*) as count FROM "{self.TABLE_NAME}"'
-        result = await self.db.fetch_one(query)
+    async def get_total_count(self, exact: bool = False) -> int:
+        """
+        Get total number of photos.
+        
+        Args:
+            exact: Count the rows with COUNT(*) instead of using the planner's
+                row estimate from pg_class
+                
+        Returns:
+            Number of photos (estimated unless exact is set)
+        """
+        if not exact:
+            result = await self.db.fetch_one(ESTIMATED_COUNT_SQL)
+            # reltuples is -1 until the table has been analyzed
+            if result and result['count'] is not None and result['count'] >= 0:
+                return result['count']
+        
+        result = await self.db.fetch_one(COUNT_SQL)
         return result['count'] if result else 0
     
     
-    async def get_photo_by_name(self, name: str):
+    async def get_photo_by_name(self, name: str) -> Optional[str]:
+        """
+        Get the storage URL for a photo by its filename.
+        
+        Served from the URL map loaded at startup. Filenames missing from
+        the map (e.g. photos uploaded since) are looked up individually and
+        added to it.
         
-        query = f"""
-        SELECT "url"
-        FROM "photos"
-        WHERE "filename" = :name
+        Args:
+            name: Photo filename
+            
+        Returns:
+            Photo URL or None if not found
         """
+        if not self._urls_loaded:
+            await self.load_photo_urls()
         
-        result = await self.db.fetch_one(query, {"name": name})
-
-        return result
+        url = self._name_to_url.get(name)
+        if url is not None:
+            return url
         
+        result = await self.db.fetch_one(STORAGE_URL_BY_NAME_SQL, values={"name": name})
+        if not result or not result['url']:
+            return None
         
+        self._name_to_url[name] = result['url']
+        return result['url']
 
@@ -1,7 +1,22 @@
 """
 Utility functions for the application.
 """
-from .query_builder import build_geojson_query, build_filter_conditions
-
-__all__ = ["build_geojson_query", "build_filter_conditions"]
+from .query_builder import (
+    build_geojson_query,
+    build_features_query,
+    build_mvt_query,
+    build_extent_query,
+    build_table_counts_query,
+    build_filter_conditions
+)
+from .cache import TTLCache
 
+__all__ = [
+    "build_geojson_query",
+    "build_features_query",
+    "build_mvt_query",
+    "build_extent_query",
+    "build_table_counts_query",
+    "build_filter_conditions",
+    "TTLCache"
+]
@@ -0,0 +1,163 @@
+"""
+In-process caching utilities.
+Provides a small TTL + LRU cache for encoded API responses.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+# Result handed to waiters when the computing caller was cancelled
+_CANCELLED = object()
+
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries expire after a fixed time-to-live.
+    
+    The cache is bounded by its number of entries and, when given a sizeof
+    function, by the total size of its values.
+    
+    Concurrent misses for the same key are coalesced by get_or_set, so only
+    one caller computes the value while the others wait for it.
+    
+    Not thread-safe; intended to be used from a single asyncio event loop.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 64,
+        ttl: float = 300,
+        maxbytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept before evicting the oldest
+            ttl: Number of seconds an entry stays valid
+            maxbytes: Maximum total size of the values kept before evicting
+                the oldest; values larger than this are not stored at all
+            sizeof: Function returning the size of a value in bytes; required
+                for maxbytes to apply
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries if full.
+        
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        size = self.sizeof(value) if self.sizeof else 0
+        if key in self._data:
+            self._remove(key)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        
+        self._data[key] = (time.monotonic() + self.ttl, value, size)
+        self.nbytes += size
+        while len(self._data) > self.maxsize or (
+            self.maxbytes is not None and self.nbytes > self.maxbytes
+        ):
+            self._remove(next(iter(self._data)))
+    
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and release its size."""
+        self.nbytes -= self._data.pop(key)[2]
+    
+    async def get_or_set(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Get a cached value, computing and storing it on a miss.
+        
+        If another caller is already computing the same key, wait for its
+        result instead of running the factory again. A None result is
+        returned to every waiting caller but not stored, so misses do not
+        take up cache entries.
+        
+        Args:
+            key: Cache key
+            factory: Coroutine function producing the value on a miss
+            
+        Returns:
+            The cached or freshly computed value
+            
+        Raises:
+            Exception: Whatever the factory raised, for every waiting caller
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            
+            value = await asyncio.shield(future)
+            if value is not _CANCELLED:
+                return value
+            # The computing caller was cancelled; try again ourselves
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await factory()
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise the exception; mark it retrieved for asyncio
+            future.exception()
+            raise
+        else:
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(_CANCELLED)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+        self.nbytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,156 +1,840 @@
 """
 SQL query builder utilities for geologic data queries.
 Handles dynamic GeoJSON generation and filtering.
+
+GeoJSON queries return the complete, encoded document as one text value,
+plus its md5 for the ETag. Routers send it as the raw response body and
+leave compression to the response middleware, which then works over one
+contiguous buffer.
 """
-from typing import Dict, List, Tuple, Any, Optional
-from app.models.geologic import FilterParams, BoundingBox
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple, Any, Optional, Sequence
+from app.models.geologic import FeatureFilters
+
+
+# Bind parameter names for bounding box coordinates, in FeatureFilters.bbox order
+BBOX_PARAMS = ('min_lng', 'min_lat', 'max_lng', 'max_lat')
+
+# Name of the CTE holding the bounding box envelope
+BBOX_CTE = 'bbox_q'
+
+# Bits of a filter mask, one per FeatureFilters field that adds a WHERE condition
+FILTER_BBOX = 1 << 0
+FILTER_NAME = 1 << 1
+FILTER_MAP_SYMBOL = 1 << 2
+FILTER_FEATURE_TYPE = 1 << 3
+FILTER_REGION = 1 << 4
+FILTER_FAN_ID = 1 << 5
+# Bounding box matched on the index only, without the exact ST_Intersects test
+FILTER_BBOX_LOOSE = 1 << 6
+# Keyset pagination cursor, compared against the table's primary key
+FILTER_AFTER = 1 << 7
+
+# Columns the name filter may match, depending on the table
+NAME_COLUMNS = ('Name', 'NAME', 'name')
+
+# Lowercased, trigram-indexed copy of the name column added by
+# migrations/002_name_norm_columns.sql; preferred by the name filter
+NAME_NORM_COLUMN = 'name_norm'
+
+# Stored ST_Envelope of the geometry added by migrations/004_bbox_columns.sql;
+# preferred by the bbox filter's index test and by extent queries
+BBOX_COLUMN = 'bbox'
+
+# Indexed envelope columns of tables whose envelope is not stored as
+# BBOX_COLUMN, keyed by table name; like BBOX_COLUMN, they are used by the
+# bbox filter's index test and by extent queries, and never returned
+BBOX_COLUMNS: Dict[str, str] = {}
+
+# Generated columns that only exist to serve filters, never returned as properties
+DERIVED_COLUMNS = frozenset({NAME_NORM_COLUMN, BBOX_COLUMN})
+
+# Columns the map symbol filter may match, depending on the table
+MAP_SYMBOL_COLUMNS = ('MAP_SYMBOL', 'MAPSYMBOL', 'map_symbol')
+
+# Columns compared for equality by the filters, whose types decide whether
+# the comparison needs a cast
+EQUALITY_FILTER_COLUMNS = frozenset({*MAP_SYMBOL_COLUMNS, 'FEATURETYP', 'REGION', 'FanID'})
+
+# Column data types (as format_type() names them) compared with text and
+# integer parameters as they are, so a B-tree index on the column still applies
+TEXT_TYPES = frozenset({'text', 'character varying'})
+INTEGER_TYPES = frozenset({'smallint', 'integer', 'bigint'})
+
+
+def quote_ident(name: str) -> str:
+    """
+    Quote a SQL identifier (table or column name) for safe interpolation.
+    
+    Args:
+        name: Identifier to quote
+        
+    Returns:
+        Double-quoted identifier with embedded quotes escaped
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+# PostgreSQL functions accept at most 100 arguments, i.e. 50 key/value pairs
+JSONB_BUILD_OBJECT_MAX_PAIRS = 50
+
+
+def quote_literal(value: str) -> str:
+    """
+    Quote a string as a SQL literal.
+    
+    Args:
+        value: String to quote
+        
+    Returns:
+        Single-quoted literal with embedded quotes doubled
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+def build_jsonb_object(columns: List[str], table_alias: Optional[str] = None) -> str:
+    """
+    Build a jsonb expression with one key per column.
+    
+    Column lists longer than jsonb_build_object's argument limit are split
+    into several objects concatenated with ||.
+    
+    Args:
+        columns: Column names; each becomes a key with the same name
+        table_alias: Optional alias to qualify the columns with
+        
+    Returns:
+        SQL jsonb expression
+    """
+    if not columns:
+        return "'{}'::jsonb"
+    
+    prefix = f"{table_alias}." if table_alias else ""
+    pairs = []
+    for column in columns:
+        key = column.replace("'", "''")
+        pairs.append(f"'{key}', {prefix}{quote_ident(column)}")
+    objects = [
+        f"jsonb_build_object({', '.join(pairs[i:i + JSONB_BUILD_OBJECT_MAX_PAIRS])})"
+        for i in range(0, len(pairs), JSONB_BUILD_OBJECT_MAX_PAIRS)
+    ]
+    return " || ".join(objects)
+
+
+# Named bind parameter (":name"), not matching "::type" casts
+_NAMED_PARAM = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+
+@lru_cache(maxsize=256)
+def to_positional(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Rewrite named bind parameters into asyncpg's positional form.
+    
+    Results are cached, since queries come from a small set of templates.
+    
+    Args:
+        query: SQL using :name placeholders
+        
+    Returns:
+        Tuple of (query using $1, $2... placeholders, parameter names in
+        positional order)
+    """
+    names: List[str] = []
+    
+    def replace(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+    
+    return _NAMED_PARAM.sub(replace, query), tuple(names)
+
+
+def filter_mask(filters: Optional[FeatureFilters]) -> int:
+    """
+    Compute the bitmask of filters that add a WHERE condition.
+    
+    Queries with the same mask share the same SQL text and differ only in
+    their parameter values.
+    
+    Args:
+        filters: Filter parameters, or None
+        
+    Returns:
+        Combination of the FILTER_* bits
+    """
+    if filters is None:
+        return 0
+    
+    mask = 0
+    if filters.bbox:
+        mask |= FILTER_BBOX
+        if filters.bbox_false_positives_ok:
+            mask |= FILTER_BBOX_LOOSE
+    if filters.name:
+        mask |= FILTER_NAME
+    if filters.map_symbol:
+        mask |= FILTER_MAP_SYMBOL
+    if filters.feature_type:
+        mask |= FILTER_FEATURE_TYPE
+    if filters.region:
+        mask |= FILTER_REGION
+    if filters.fan_id is not None:
+        mask |= FILTER_FAN_ID
+    if filters.after is not None:
+        mask |= FILTER_AFTER
+    return mask
+
+
+def build_query_params(filters: Optional[FeatureFilters]) -> Dict[str, Any]:
+    """
+    Build the bind parameters for a feature query.
+    
+    Args:
+        filters: Filter parameters, or None for the default page
+        
+    Returns:
+        Parameters matching the placeholders of the query template
+    """
+    if filters is None:
+        return {'limit': 100, 'offset': 0}
+    
+    params = _filter_params(filters)
+    params['limit'] = filters.limit
+    params['offset'] = filters.offset
+    if filters.after is not None:
+        params['after'] = filters.after
+    return params
 
 
 def build_geojson_query(
     table_name: str,
     geometry_column: str = "geometry",
-    filters: Optional[FilterParams] = None,
-    properties: Optional[List[str]] = None
+    filters: Optional[FeatureFilters] = None,
+    properties: Optional[Sequence[str]] = None,
+    srid: int = 4326,
+    columns: Optional[Sequence[str]] = None,
+    primary_key: Optional[Tuple[str, str]] = None,
+    subdivided: Optional[str] = None,
+    column_types: Optional[Sequence[Tuple[str, str]]] = None,
+    bbox_column: Optional[str] = None
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Build a SQL query that returns GeoJSON format directly from PostGIS.
     
+    Each Feature is written in one pass by ST_AsGeoJSON(record) and the
+    FeatureCollection is cast to text once at the end, so the driver hands
+    back the encoded document without parsing it. Callers should send that
+    text as a raw response body (GeoJSONResponse) rather than decoding it
+    and re-encoding it through JSONResponse. The md5 of the text is returned
+    alongside it as etag, so it never has to be hashed in Python.
+    
     Args:
         table_name: Name of the table to query
         geometry_column: Name of the geometry column
         filters: Optional filter parameters
-        properties: List of property columns to include (None = all)
+        properties: Property columns to include (None = all); pass a tuple to
+            reuse it as the template cache key without copying
+        srid: SRID of the geometry column
+        columns: Columns the table has, to pick the name filter column and
+            the bbox index column; None assumes the legacy name columns
+        primary_key: (column, type) of the table's single-column primary key;
+            rows are ordered by it and filters.after pages on it
+        subdivided: Table of ST_Subdivide pieces sharing the primary key,
+            matched instead of the whole geometry by the bbox filter
+        column_types: (column, data type) pairs of the table, so equality
+            filters only cast columns whose type differs; None casts them all
+        bbox_column: Indexed envelope column for the bbox filter's index
+            test, overriding the BBOX_COLUMN found in columns
         
     Returns:
         Tuple of (query_string, parameters_dict)
     """
-    params = {}
-    where_conditions = []
+    query = _geojson_template(
+        table_name,
+        geometry_column,
+        _as_tuple(properties),
+        filter_mask(filters),
+        srid,
+        name_filter_columns(columns),
+        bbox_column or bbox_filter_column(columns),
+        primary_key,
+        subdivided,
+        equality_filter_types(column_types)
+    )
+    return query, build_query_params(filters)
+
+
+def build_features_query(
+    table_name: str,
+    geometry_column: str = "geometry",
+    filters: Optional[FeatureFilters] = None,
+    properties: Optional[Sequence[str]] = None,
+    srid: int = 4326,
+    columns: Optional[Sequence[str]] = None,
+    primary_key: Optional[Tuple[str, str]] = None,
+    subdivided: Optional[str] = None,
+    column_types: Optional[Sequence[Tuple[str, str]]] = None,
+    bbox_column: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build a SQL query that returns one encoded GeoJSON Feature per row.
+    
+    Used to stream large tables through a cursor instead of aggregating the
+    whole FeatureCollection in a single value.
+    
+    Args:
+        table_name: Name of the table to query
+        geometry_column: Name of the geometry column
+        filters: Optional filter parameters
+        properties: Property columns to include (None = all); pass a tuple to
+            reuse it as the template cache key without copying
+        srid: SRID of the geometry column
+        columns: Columns the table has, to pick the name filter column and
+            the bbox index column; None assumes the legacy name columns
+        primary_key: (column, type) of the table's single-column primary key;
+            rows are ordered by it and filters.after pages on it
+        subdivided: Table of ST_Subdivide pieces sharing the primary key,
+            matched instead of the whole geometry by the bbox filter
+        column_types: (column, data type) pairs of the table, so equality
+            filters only cast columns whose type differs; None casts them all
+        bbox_column: Indexed envelope column for the bbox filter's index
+            test, overriding the BBOX_COLUMN found in columns
+        
+    Returns:
+        Tuple of (query_string, parameters_dict)
+    """
+    query = _features_template(
+        table_name,
+        geometry_column,
+        _as_tuple(properties),
+        filter_mask(filters),
+        srid,
+        name_filter_columns(columns),
+        bbox_column or bbox_filter_column(columns),
+        primary_key,
+        subdivided,
+        equality_filter_types(column_types)
+    )
+    return query, build_query_params(filters)
+
+
+def _as_tuple(properties: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    """Return a property list as a hashable tuple, without copying tuples."""
+    if properties is None or isinstance(properties, tuple):
+        return properties
+    return tuple(properties)
+
+
+@lru_cache(maxsize=256)
+def _geojson_template(
+    table_name: str,
+    geometry_column: str,
+    properties: Optional[Tuple[str, ...]],
+    mask: int,
+    srid: int,
+    name_columns: Tuple[str, ...],
+    bbox_column: Optional[str],
+    primary_key: Optional[Tuple[str, str]],
+    subdivided: Optional[str],
+    filter_types: Optional[Tuple[Tuple[str, str], ...]]
+) -> str:
+    """Build (once per key) the FeatureCollection query text."""
+    with_clause, feature_json, source = _build_feature_source(
+        table_name, geometry_column, properties, mask, srid, name_columns, bbox_column,
+        primary_key, subdivided, filter_types
+    )
+    
+    # Build the main query
+    # This returns a complete GeoJSON FeatureCollection, with its md5 as an ETag
+    return f"""
+    {with_clause}SELECT geojson, md5(geojson) AS etag
+    FROM (
+        SELECT jsonb_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(jsonb_agg({feature_json}::jsonb), '[]'::jsonb)
+        )::text AS geojson
+        FROM ({source}) t
+    ) g
+    """
+
+
+@lru_cache(maxsize=256)
+def _features_template(
+    table_name: str,
+    geometry_column: str,
+    properties: Optional[Tuple[str, ...]],
+    mask: int,
+    srid: int,
+    name_columns: Tuple[str, ...],
+    bbox_column: Optional[str],
+    primary_key: Optional[Tuple[str, str]],
+    subdivided: Optional[str],
+    filter_types: Optional[Tuple[Tuple[str, str], ...]]
+) -> str:
+    """Build (once per key) the per-row Feature query text."""
+    with_clause, feature_json, source = _build_feature_source(
+        table_name, geometry_column, properties, mask, srid, name_columns, bbox_column,
+        primary_key, subdivided, filter_types
+    )
+    
+    return f"""
+    {with_clause}SELECT {feature_json} AS feature
+    FROM ({source}) t
+    """
+
+
+def build_mvt_query(
+    table_name: str,
+    geometry_column: str = "geometry",
+    properties: Optional[List[str]] = None,
+    srid: int = 4326,
+    extent: int = 4096,
+    buffer: int = 64
+) -> str:
+    """
+    Build a SQL query that returns one Mapbox Vector Tile for a table.
+    
+    The query takes the tile coordinates as positional parameters
+    ($1 = z, $2 = x, $3 = y) and returns a single bytea value.
+    
+    Args:
+        table_name: Name of the table to query
+        geometry_column: Name of the geometry column
+        properties: Non-geometry columns to include as feature attributes
+        srid: SRID of the geometry column
+        extent: Tile extent in screen space
+        buffer: Clipping buffer in screen space
+        
+    Returns:
+        SQL query string
+    """
+    geom = f"t.{quote_ident(geometry_column)}"
+    columns = "".join(f", t.{quote_ident(prop)}" for prop in properties or [])
+    layer = table_name.replace("'", "''")
+    
+    tile_geom = geom if srid == 3857 else f"ST_Transform({geom}, 3857)"
+    envelope = "bounds.geom"
+    if srid != 3857:
+        # Compare in the column's SRID so the spatial index applies
+        envelope = f"ST_Transform(bounds.geom, {int(srid or 4326)})"
+    
+    return f"""
+    WITH bounds AS (SELECT ST_TileEnvelope($1, $2, $3) AS geom)
+    SELECT ST_AsMVT(mvt, '{layer}', {int(extent)}, 'mvt_geom') AS tile
+    FROM (
+        SELECT ST_AsMVTGeom({tile_geom}, bounds.geom, {int(extent)}, {int(buffer)}, true) AS mvt_geom{columns}
+        FROM {quote_ident(table_name)} t, bounds
+        WHERE {geom} && {envelope}
+    ) mvt
+    """
+
+
+def build_extent_query(
+    table_name: str,
+    geometry_column: str = "geometry",
+    srid: int = 4326,
+    columns: Optional[Sequence[str]] = None,
+    bbox_column: Optional[str] = None
+) -> str:
+    """
+    Build a SQL query for the bounding box of every feature in a table.
+    
+    Reads the stored envelope column when the table has one, which a GiST
+    index-only scan can satisfy.
+    
+    Args:
+        table_name: Name of the table to query
+        geometry_column: Name of the geometry column
+        srid: SRID of the geometry column
+        columns: Columns the table has, to find the stored envelope column
+        bbox_column: Stored envelope column, overriding the BBOX_COLUMN
+            found in columns
+        
+    Returns:
+        SQL query string returning min_lng, min_lat, max_lng and max_lat
+        (all NULL for an empty table)
+    """
+    column = quote_ident(bbox_column or bbox_filter_column(columns) or geometry_column)
+    extent = f"ST_SetSRID(ST_Extent({column})::geometry, {int(srid)})"
+    if srid not in (0, 4326):
+        extent = f"ST_Transform({extent}, 4326)"
     
-    # Build WHERE clause if filters provided
-    if filters:
-        conditions, filter_params = build_filter_conditions(table_name, filters, geometry_column)
-        where_conditions.extend(conditions)
-        params.update(filter_params)
+    return f"""
+    SELECT ST_XMin(e) AS min_lng, ST_YMin(e) AS min_lat,
+           ST_XMax(e) AS max_lng, ST_YMax(e) AS max_lat
+    FROM (SELECT {extent} AS e FROM {quote_ident(table_name)}) extent
+    """
+
+
+def build_table_counts_query(tables: Sequence[str]) -> str:
+    """
+    Build a SQL query counting the rows of several tables exactly.
+    
+    All tables are counted in one statement, so listing N tables costs one
+    round trip rather than N.
+    
+    Args:
+        tables: Names of the tables to count
+        
+    Returns:
+        SQL query string returning one (table_name, feature_count) row per
+        table
+    """
+    return "\n    UNION ALL\n    ".join(
+        f"SELECT {quote_literal(table_name)} AS table_name, COUNT(*) AS feature_count "
+        f"FROM {quote_ident(table_name)}"
+        for table_name in tables
+    )
+
+
+def _build_feature_source(
+    table_name: str,
+    geometry_column: str,
+    properties: Optional[Tuple[str, ...]],
+    mask: int,
+    srid: int,
+    name_columns: Tuple[str, ...],
+    bbox_column: Optional[str],
+    primary_key: Optional[Tuple[str, str]],
+    subdivided: Optional[str],
+    filter_types: Optional[Tuple[Tuple[str, str], ...]]
+) -> Tuple[str, str, str]:
+    """
+    Build the per-row Feature expression and the filtered row source.
+    
+    Returns:
+        Tuple of (with_clause, feature_sql, source_query); with_clause is
+        empty or a complete WITH prefix for the outer query
+    
+    Raises:
+        ValueError: If keyset pagination is requested without a primary key
+    """
+    # Large polygons have envelopes that overlap far more boxes than the
+    # polygons do; matching their subdivided pieces keeps the index test
+    # selective, and a feature matches if any of its pieces does
+    subdivided_bbox = bool(subdivided and primary_key and mask & FILTER_BBOX)
+    if subdivided_bbox:
+        mask_without_bbox = mask & ~(FILTER_BBOX | FILTER_BBOX_LOOSE)
+        ctes, conditions = _filter_conditions(
+            mask_without_bbox, geometry_column, srid, name_columns, bbox_column,
+            filter_types
+        )
+        envelope_cte, envelope = _bbox_envelope(srid)
+        key = quote_ident(primary_key[0])
+        piece = f"s.{quote_ident(geometry_column)}"
+        exact = "" if mask & FILTER_BBOX_LOOSE else f" AND ST_Intersects({piece}, {envelope})"
+        ctes = (envelope_cte, *ctes)
+        conditions = (f"""EXISTS (
+            SELECT 1 FROM {quote_ident(subdivided)} s
+            WHERE s.{key} = {quote_ident(table_name)}.{key}
+            AND {piece} && {envelope}{exact}
+        )""", *conditions)
+    else:
+        ctes, conditions = _filter_conditions(
+            mask, geometry_column, srid, name_columns, bbox_column, filter_types
+        )
+    where_conditions = list(conditions)
+    with_clause = f"WITH {', '.join(ctes)}\n    " if ctes else ""
+    
+    # Pages are ordered by the primary key so they are stable; a keyset
+    # cursor then seeks straight to the next page on the key's index
+    # instead of reading and discarding every row before an OFFSET
+    order_clause = ""
+    page_clause = "LIMIT :limit OFFSET :offset"
+    if primary_key is not None:
+        key, key_type = primary_key
+        order_clause = f"ORDER BY {quote_ident(key)}"
+        if mask & FILTER_AFTER:
+            # The cursor is bound as text and cast to the key's own type
+            where_conditions.append(
+                f"{quote_ident(key)} > CAST(CAST(:after AS text) AS {key_type})"
+            )
+            page_clause = "LIMIT :limit"
+    elif mask & FILTER_AFTER:
+        raise ValueError(f"Table '{table_name}' has no primary key to page by")
     
     where_clause = ""
     if where_conditions:
         where_clause = "WHERE " + " AND ".join(where_conditions)
     
-    # Build the property columns list
+    # ST_AsGeoJSON(record) writes the whole Feature in one pass, using every
+    # column except the geometry as properties; a property subset is
+    # selected in the row source instead
     if properties is None:
-        # Get all columns except geometry (using the actual geometry column name)
-        properties_json = f"""
-            json_build_object(
-                'properties', row_to_json(t.*)::jsonb - '{geometry_column}'
-            )->'properties'
-        """
+        columns = "*"
     else:
-        # Build specific properties
-        prop_pairs = [f"'{prop}', \"{prop}\"" for prop in properties]
-        properties_json = f"json_build_object({', '.join(prop_pairs)})"
+        selected = [column for column in properties if column != geometry_column]
+        selected.append(geometry_column)
+        columns = ", ".join(quote_ident(column) for column in selected)
     
-    # Build the main query
-    # This returns a complete GeoJSON FeatureCollection
-    query = f"""
-    SELECT json_build_object(
-        'type', 'FeatureCollection',
-        'features', COALESCE(json_agg(
-            json_build_object(
-                'type', 'Feature',
-                'geometry', ST_AsGeoJSON("{geometry_column}")::json,
-                'properties', {properties_json}
-            )
-        ), '[]'::json)
-    ) AS geojson
-    FROM (
-        SELECT * FROM "{table_name}"
+    geometry_literal = geometry_column.replace("'", "''")
+    feature_json = f"ST_AsGeoJSON(t.*, '{geometry_literal}')"
+    
+    source = f"""
+        SELECT {columns} FROM {quote_ident(table_name)}
         {where_clause}
-        LIMIT :limit OFFSET :offset
-    ) t
+        {order_clause}
+        {page_clause}
     """
     
-    # Add pagination parameters
-    params['limit'] = filters.limit if filters else 100
-    params['offset'] = filters.offset if filters else 0
-    
-    return query, params
+    return with_clause, feature_json, source
 
 
 def build_filter_conditions(
     table_name: str,
-    filters: FilterParams,
-    geometry_column: str = "geometry"
-) -> Tuple[List[str], Dict[str, Any]]:
+    filters: FeatureFilters,
+    geometry_column: str = "geometry",
+    srid: int = 4326,
+    columns: Optional[Sequence[str]] = None,
+    column_types: Optional[Sequence[Tuple[str, str]]] = None,
+    bbox_column: Optional[str] = None
+) -> Tuple[List[str], List[str], Dict[str, Any]]:
     """
     Build WHERE clause conditions and parameters from filter params.
     
+    Conditions may reference common table expressions (such as the
+    bounding box envelope), which the query must declare in a WITH clause.
+    
     Args:
         table_name: Name of the table being queried
         filters: Filter parameters
         geometry_column: Name of the geometry column (default: "geometry")
+        srid: SRID of the geometry column (default: 4326)
+        columns: Columns the table has, to pick the name filter column and
+            the bbox index column; None assumes the legacy name columns
+        column_types: (column, data type) pairs of the table, so equality
+            filters only cast columns whose type differs; None casts them all
+        bbox_column: Indexed envelope column for the bbox filter's index
+            test, overriding the BBOX_COLUMN found in columns; the exact
+            test still uses the geometry column
+        
+    Returns:
+        Tuple of (with_clauses, conditions_list, parameters_dict)
+    """
+    ctes, conditions = _filter_conditions(
+        filter_mask(filters),
+        geometry_column,
+        srid,
+        name_filter_columns(columns),
+        bbox_column or bbox_filter_column(columns),
+        equality_filter_types(column_types)
+    )
+    return list(ctes), list(conditions), _filter_params(filters)
+
+
+def name_filter_columns(columns: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    """
+    Pick the columns the name filter should match for a table.
+    
+    Args:
+        columns: Columns the table has, or None if unknown
+        
+    Returns:
+        (NAME_NORM_COLUMN,) if the table has it, otherwise the NAME_COLUMNS
+        the table has (all of them if its columns are unknown)
+    """
+    if columns is None:
+        return NAME_COLUMNS
+    if NAME_NORM_COLUMN in columns:
+        return (NAME_NORM_COLUMN,)
+    return tuple(column for column in NAME_COLUMNS if column in columns)
+
+
+def bbox_filter_column(columns: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    Pick the stored envelope column the bbox index test should use.
+    
+    Args:
+        columns: Columns the table has, or None if unknown
+        
+    Returns:
+        BBOX_COLUMN if the table has it, otherwise None (use the geometry)
+    """
+    if columns is not None and BBOX_COLUMN in columns:
+        return BBOX_COLUMN
+    return None
+
+
+def equality_filter_types(
+    column_types: Optional[Sequence[Tuple[str, str]]] = None
+) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """
+    Pick the types of the columns the equality filters compare.
+    
+    Args:
+        column_types: (column, data type) pairs of the table, or None if
+            unknown
         
     Returns:
-        Tuple of (conditions_list, parameters_dict)
+        (column, data type) pairs of the EQUALITY_FILTER_COLUMNS the table
+        has, or None if its columns are unknown
     """
+    if column_types is None:
+        return None
+    return tuple(
+        (column, data_type) for column, data_type in column_types
+        if column in EQUALITY_FILTER_COLUMNS
+    )
+
+
+@lru_cache(maxsize=256)
+def _filter_conditions(
+    mask: int,
+    geometry_column: str,
+    srid: int,
+    name_columns: Tuple[str, ...] = NAME_COLUMNS,
+    bbox_column: Optional[str] = None,
+    filter_types: Optional[Tuple[Tuple[str, str], ...]] = None
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Build (once per key) the CTEs and WHERE conditions for a filter mask.
+    
+    Placeholders are the same for every query with this mask, so only the
+    parameter values change between requests.
+    """
+    ctes = []
     conditions = []
-    params = {}
     
     # Bounding box filter (spatial)
-    if filters.bbox:
-        try:
-            coords = [float(x.strip()) for x in filters.bbox.split(',')]
-            if len(coords) == 4:
-                min_lng, min_lat, max_lng, max_lat = coords
-                # Use ST_Intersects with a bounding box (using actual geometry column)
-                conditions.append(f"""
-                    ST_Intersects(
-                        "{geometry_column}",
-                        ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)
-                    )
-                """)
-                params.update({
-                    'min_lng': min_lng,
-                    'min_lat': min_lat,
-                    'max_lng': max_lng,
-                    'max_lat': max_lat
-                })
-        except (ValueError, AttributeError):
-            pass  # Invalid bbox format, skip
+    if mask & FILTER_BBOX:
+        geom = quote_ident(geometry_column)
+        envelope_cte, envelope = _bbox_envelope(srid)
+        ctes.append(envelope_cte)
+        # The && operator is what lets the planner use the GiST index, on the
+        # stored envelope if the table has one; ST_Intersects then does the
+        # exact test on the candidates, unless the caller accepts features
+        # whose bounding box merely overlaps
+        index_geom = quote_ident(bbox_column) if bbox_column else geom
+        conditions.append(f"{index_geom} && {envelope}")
+        if not mask & FILTER_BBOX_LOOSE:
+            conditions.append(f"ST_Intersects({geom}, {envelope})")
     
     # Name filter (case-insensitive partial match)
-    if filters.name:
-        # Try multiple name columns that might exist
-        name_conditions = []
-        for col in ['Name', 'NAME', 'name']:
-            name_conditions.append(f'LOWER(CAST("{col}" AS TEXT)) LIKE LOWER(:name_pattern)')
-        conditions.append(f"({' OR '.join(name_conditions)})")
-        params['name_pattern'] = f"%{filters.name}%"
+    if mask & FILTER_NAME:
+        if name_columns == (NAME_NORM_COLUMN,):
+            # Single lowercased column served by its trigram index
+            conditions.append(f'{quote_ident(NAME_NORM_COLUMN)} ILIKE :name_pattern')
+        elif name_columns:
+            name_conditions = [
+                f'CAST({quote_ident(col)} AS TEXT) ILIKE :name_pattern'
+                for col in name_columns
+            ]
+            conditions.append(f"({' OR '.join(name_conditions)})")
+        else:
+            # The table has no name column, so nothing can match
+            conditions.append("FALSE")
+    
+    # Equality filters; a column missing from the table matches nothing
+    types = dict(filter_types) if filter_types is not None else None
     
     # Map symbol filter
-    if filters.map_symbol:
-        map_conditions = []
-        for col in ['MAP_SYMBOL', 'MAPSYMBOL', 'map_symbol']:
-            map_conditions.append(f'CAST("{col}" AS TEXT) = :map_symbol')
-        conditions.append(f"({' OR '.join(map_conditions)})")
-        params['map_symbol'] = filters.map_symbol
+    if mask & FILTER_MAP_SYMBOL:
+        map_conditions = [
+            condition for condition in (
+                _equals(col, 'map_symbol', 'TEXT', TEXT_TYPES, types)
+                for col in MAP_SYMBOL_COLUMNS
+            )
+            if condition
+        ]
+        conditions.append(f"({' OR '.join(map_conditions)})" if map_conditions else "FALSE")
     
     # Feature type filter
-    if filters.feature_type:
-        conditions.append('CAST("FEATURETYP" AS TEXT) = :feature_type')
-        params['feature_type'] = filters.feature_type
+    if mask & FILTER_FEATURE_TYPE:
+        conditions.append(
+            _equals('FEATURETYP', 'feature_type', 'TEXT', TEXT_TYPES, types) or "FALSE"
+        )
     
     # Region filter
-    if filters.region:
-        conditions.append('CAST("REGION" AS TEXT) = :region')
-        params['region'] = filters.region
+    if mask & FILTER_REGION:
+        conditions.append(_equals('REGION', 'region', 'TEXT', TEXT_TYPES, types) or "FALSE")
     
     # Fan ID filter
+    if mask & FILTER_FAN_ID:
+        conditions.append(
+            _equals('FanID', 'fan_id', 'INTEGER', INTEGER_TYPES, types) or "FALSE"
+        )
+    
+    return tuple(ctes), tuple(conditions)
+
+
+def _equals(
+    column: str,
+    param: str,
+    cast_type: str,
+    native_types: frozenset,
+    types: Optional[Dict[str, str]]
+) -> Optional[str]:
+    """
+    Build an equality condition between a column and a bind parameter.
+    
+    The column is cast to cast_type unless its type is one of native_types,
+    since a cast keeps the planner from using an index on the column.
+    
+    Returns:
+        The condition, or None if the table is known not to have the column
+    """
+    if types is not None and column not in types:
+        return None
+    if types is not None and types[column] in native_types:
+        return f"{quote_ident(column)} = :{param}"
+    return f"CAST({quote_ident(column)} AS {cast_type}) = :{param}"
+
+
+def _bbox_envelope(srid: int) -> Tuple[str, str]:
+    """
+    Build the CTE holding the bbox filter's envelope in a column's SRID.
+    
+    The envelope is built once per query; the scalar subquery referencing
+    it becomes an init plan, so every predicate reuses the same value.
+    
+    Returns:
+        Tuple of (cte_definition, envelope_expression)
+    """
+    envelope = "ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)"
+    if srid not in (0, 4326):
+        # Transform the WGS84 envelope into the column's SRID so the index applies
+        envelope = f"ST_Transform({envelope}, {int(srid)})"
+    return f"{BBOX_CTE} AS (SELECT {envelope} AS g)", f"(SELECT g FROM {BBOX_CTE})"
+
+
+def _filter_params(filters: FeatureFilters) -> Dict[str, Any]:
+    """Build the bind parameters for the conditions of _filter_conditions."""
+    params: Dict[str, Any] = {}
+    
+    if filters.bbox:
+        params.update(zip(BBOX_PARAMS, filters.bbox))
+    if filters.name:
+        params['name_pattern'] = f"%{filters.name.lower()}%"
+    if filters.map_symbol:
+        params['map_symbol'] = filters.map_symbol
+    if filters.feature_type:
+        params['feature_type'] = filters.feature_type
+    if filters.region:
+        params['region'] = filters.region
     if filters.fan_id is not None:
-        conditions.append('CAST("FanID" AS INTEGER) = :fan_id')
         params['fan_id'] = filters.fan_id
     
-    return conditions, params
+    return params
+
+
+# Display names for tables whose title-cased name would read poorly
+DISPLAY_NAMES: Dict[str, str] = {
+    'atlas_maps': 'Atlas Maps',
+    'atlasmaps': 'Atlas Maps (Extended)',
+    'fan_geology': 'Fan Geology',
+    'fangeology': 'Fan Geology (Detailed)',
+    'fan_delivery_system': 'Fan Delivery System',
+    'fieldtripstops': 'Field Trip Stops',
+    'ftrip_m': 'Field Trip Markers',
+    'gis_region_large': 'Large GIS Regions',
+    'gis_region_small': 'Small GIS Regions',
+    'gradient_regions': 'Gradient Regions',
+    'measured_sections_all_areas': 'Measured Sections',
+    'photo_panels': 'Photo Panels',
+    'geospatial_data': 'Geospatial Data (General)',
+}
 
 
 def get_table_display_name(table_name: str) -> str:
@@ -163,26 +847,9 @@ def get_table_display_name(table_name: str) -> str:
     Returns:
         Human-readable name
     """
-    # Special cases
-    name_map = {
-        'atlas_maps': 'Atlas Maps',
-        'atlasmaps': 'Atlas Maps (Extended)',
-        'fan_geology': 'Fan Geology',
-        'fangeology': 'Fan Geology (Detailed)',
-        'fan_delivery_system': 'Fan Delivery System',
-        'fieldtripstops': 'Field Trip Stops',
-        'ftrip_m': 'Field Trip Markers',
-        'gis_region_large': 'Large GIS Regions',
-        'gis_region_small': 'Small GIS Regions',
-        'gradient_regions': 'Gradient Regions',
-        'measured_sections_all_areas': 'Measured Sections',
-        'photo_panels': 'Photo Panels',
-        'geospatial_data': 'Geospatial Data (General)',
-    }
-    
-    if table_name in name_map:
-        return name_map[table_name]
+    display_name = DISPLAY_NAMES.get(table_name)
+    if display_name is not None:
+        return display_name
     
     # Default: title case with underscores replaced by spaces
     return table_name.replace('_', ' ').title()
-
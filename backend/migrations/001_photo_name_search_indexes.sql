@@ -0,0 +1,20 @@
+-- Indexes for case-insensitive photo search.
+--
+-- list_photos filters with "NAME" ILIKE '%...%' / "PM_NAME" ILIKE '%...%';
+-- trigram GIN indexes let the planner serve those partial matches without
+-- a sequential scan. The lower(filename) index covers exact,
+-- case-insensitive filename lookups on the photos storage table.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS photo_panels_name_trgm_idx
+    ON photo_panels USING gin ("NAME" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS photo_panels_pm_name_trgm_idx
+    ON photo_panels USING gin ("PM_NAME" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS photos_filename_lower_idx
+    ON photos (LOWER(filename));
+
+CREATE INDEX IF NOT EXISTS photos_filename_trgm_idx
+    ON photos USING gin (filename gin_trgm_ops);
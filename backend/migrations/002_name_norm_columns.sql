@@ -0,0 +1,48 @@
+-- Indexed name column for the geologic name filter.
+--
+-- The name filter otherwise ORs CAST(... AS TEXT) ILIKE '%...%' over every
+-- name column a table has ("Name", "NAME", "name"), which no index can
+-- serve. This adds a lowercased generated column name_norm, coalescing
+-- whichever of those columns exist, to every geometry table that has one,
+-- plus a trigram GIN index on it. The API picks name_norm up automatically
+-- when it reloads table metadata, and never returns it as a property.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DO $$
+DECLARE
+    tbl record;
+BEGIN
+    FOR tbl IN
+        SELECT
+            c.table_name,
+            string_agg(
+                format('%I::text', c.column_name), ', '
+                ORDER BY array_position(ARRAY['Name', 'NAME', 'name'], c.column_name::text)
+            ) AS name_columns
+        FROM information_schema.columns c
+        JOIN geometry_columns gc
+            ON gc.f_table_schema = c.table_schema
+            AND gc.f_table_name = c.table_name
+        WHERE c.table_schema = 'public'
+            AND c.column_name IN ('Name', 'NAME', 'name')
+            AND NOT EXISTS (
+                SELECT 1 FROM information_schema.columns n
+                WHERE n.table_schema = c.table_schema
+                    AND n.table_name = c.table_name
+                    AND n.column_name = 'name_norm'
+            )
+        GROUP BY c.table_name
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %I ADD COLUMN name_norm text '
+            'GENERATED ALWAYS AS (lower(COALESCE(%s))) STORED',
+            tbl.table_name, tbl.name_columns
+        );
+        EXECUTE format(
+            'CREATE INDEX IF NOT EXISTS %I ON %I USING gin (name_norm gin_trgm_ops)',
+            tbl.table_name || '_name_norm_trgm_idx', tbl.table_name
+        );
+    END LOOP;
+END
+$$;
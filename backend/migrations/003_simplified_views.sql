@@ -0,0 +1,83 @@
+-- Simplified copies of the large geologic tables for low zoom levels.
+--
+-- Requests that pass zoom=<z> read from the least simplified view named
+-- <table>_z<max zoom> whose max zoom is at least z, so zoomed-out maps
+-- serialize far fewer vertices. Each view keeps every attribute column and
+-- simplifies the geometry to about one pixel at its max zoom (256 px
+-- tiles), keeping the base table's SRID. The API discovers the views from
+-- geometry_columns when it reloads table metadata; they are not listed or
+-- queryable on their own. Pages of a view are ordered and keyset paged by
+-- the base table's primary key, which each view indexes too.
+--
+-- Refresh the views after reloading a base table:
+--     REFRESH MATERIALIZED VIEW atlas_maps_z8;
+
+DO $$
+DECLARE
+    tbl record;
+    max_zoom integer;
+    tolerance double precision;
+    attribute_columns text;
+    key_column text;
+BEGIN
+    FOR tbl IN
+        SELECT f_table_name, f_geometry_column, srid
+        FROM geometry_columns
+        WHERE f_table_schema = 'public'
+            AND f_table_name IN ('atlas_maps', 'fan_geology')
+    LOOP
+        SELECT string_agg(format('%I', column_name), ', ' ORDER BY ordinal_position)
+        INTO attribute_columns
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+            AND table_name = tbl.f_table_name
+            AND column_name <> tbl.f_geometry_column;
+
+        -- Single-column primary key of the base table, if it has one
+        SELECT a.attname
+        INTO key_column
+        FROM pg_index i
+        JOIN pg_attribute a
+            ON a.attrelid = i.indrelid
+            AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = format('%I', tbl.f_table_name)::regclass
+            AND i.indisprimary
+            AND i.indnkeyatts = 1;
+
+        FOREACH max_zoom IN ARRAY ARRAY[8, 12]
+        LOOP
+            -- Width of one pixel at this zoom, in degrees or in meters
+            IF tbl.srid IN (0, 4326) THEN
+                tolerance := 360.0 / (256 * 2 ^ max_zoom);
+            ELSE
+                tolerance := 40075016.686 / (256 * 2 ^ max_zoom);
+            END IF;
+
+            EXECUTE format(
+                'CREATE MATERIALIZED VIEW IF NOT EXISTS %I AS '
+                'SELECT %s%sST_SimplifyPreserveTopology(%I, %s)::geometry(Geometry, %s) AS %I '
+                'FROM %I',
+                tbl.f_table_name || '_z' || max_zoom,
+                COALESCE(attribute_columns, ''),
+                CASE WHEN attribute_columns IS NULL THEN '' ELSE ', ' END,
+                tbl.f_geometry_column, tolerance, tbl.srid, tbl.f_geometry_column,
+                tbl.f_table_name
+            );
+            EXECUTE format(
+                'CREATE INDEX IF NOT EXISTS %I ON %I USING gist (%I)',
+                tbl.f_table_name || '_z' || max_zoom || '_geom_idx',
+                tbl.f_table_name || '_z' || max_zoom,
+                tbl.f_geometry_column
+            );
+            IF key_column IS NOT NULL THEN
+                EXECUTE format(
+                    'CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I (%I)',
+                    tbl.f_table_name || '_z' || max_zoom || '_key_idx',
+                    tbl.f_table_name || '_z' || max_zoom,
+                    key_column
+                );
+            END IF;
+        END LOOP;
+    END LOOP;
+END
+$$;
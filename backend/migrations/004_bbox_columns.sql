@@ -0,0 +1,46 @@
+-- Stored bounding boxes for the geologic tables.
+--
+-- Adds a generated bbox column holding ST_Envelope of the geometry, with a
+-- GiST index, to every public geometry table except photo_panels (served
+-- by the photos API, which returns every other column as a property). The
+-- bbox filter runs its && index test against this column, and the extent
+-- endpoint's ST_Extent(bbox) can be answered by an index-only scan. The
+-- API picks the column up when it reloads table metadata and never
+-- returns it as a property.
+
+DO $$
+DECLARE
+    tbl record;
+BEGIN
+    FOR tbl IN
+        -- One envelope per table, of its first geometry column
+        SELECT DISTINCT ON (gc.f_table_name)
+            gc.f_table_name, gc.f_geometry_column, gc.srid
+        FROM geometry_columns gc
+        JOIN information_schema.tables t
+            ON t.table_schema = gc.f_table_schema
+            AND t.table_name = gc.f_table_name
+            AND t.table_type = 'BASE TABLE'
+        WHERE gc.f_table_schema = 'public'
+            AND gc.f_table_name <> 'photo_panels'
+            AND gc.f_geometry_column <> 'bbox'
+            AND NOT EXISTS (
+                SELECT 1 FROM information_schema.columns c
+                WHERE c.table_schema = gc.f_table_schema
+                    AND c.table_name = gc.f_table_name
+                    AND c.column_name = 'bbox'
+            )
+        ORDER BY gc.f_table_name, gc.f_geometry_column
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %I ADD COLUMN bbox geometry(Geometry, %s) '
+            'GENERATED ALWAYS AS (ST_Envelope(%I)) STORED',
+            tbl.f_table_name, tbl.srid, tbl.f_geometry_column
+        );
+        EXECUTE format(
+            'CREATE INDEX IF NOT EXISTS %I ON %I USING gist (bbox)',
+            tbl.f_table_name || '_bbox_idx', tbl.f_table_name
+        );
+    END LOOP;
+END
+$$;
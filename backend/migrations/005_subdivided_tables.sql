@@ -0,0 +1,59 @@
+-- Subdivided geometries for the large polygon tables.
+--
+-- The envelope of a big compound polygon overlaps far more bounding boxes
+-- than the polygon itself, so the && index test lets through many rows the
+-- exact ST_Intersects then discards. <table>_sub holds each geometry cut
+-- by ST_Subdivide into pieces of at most 256 vertices, keyed by the base
+-- table's primary key; the bbox filter matches a feature when any of its
+-- pieces intersects the box. The API picks the tables up when it reloads
+-- table metadata; they are not listed or queryable on their own.
+--
+-- Rebuild a table's pieces after reloading it:
+--     TRUNCATE fan_geology_sub;
+--     INSERT INTO fan_geology_sub SELECT "<key>", ST_Subdivide(geom, 256) FROM fan_geology;
+
+DO $$
+DECLARE
+    tbl record;
+BEGIN
+    FOR tbl IN
+        SELECT DISTINCT ON (gc.f_table_name)
+            gc.f_table_name, gc.f_geometry_column, gc.srid, a.attname AS key_column
+        FROM geometry_columns gc
+        JOIN pg_index i
+            ON i.indrelid = to_regclass(format('%I.%I', gc.f_table_schema, gc.f_table_name))
+            AND i.indisprimary
+            AND i.indnkeyatts = 1
+        JOIN pg_attribute a
+            ON a.attrelid = i.indrelid
+            AND a.attnum = i.indkey[0]
+        WHERE gc.f_table_schema = 'public'
+            AND gc.f_table_name IN (
+                'atlas_maps', 'fan_geology', 'fan_delivery_system',
+                'gis_region_large', 'gis_region_small', 'gradient_regions'
+            )
+            AND gc.f_geometry_column <> 'bbox'
+            AND to_regclass(format('%I.%I', gc.f_table_schema, gc.f_table_name || '_sub')) IS NULL
+        ORDER BY gc.f_table_name, gc.f_geometry_column
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I AS '
+            'SELECT %I, ST_Subdivide(%I, 256)::geometry(Geometry, %s) AS %I FROM %I',
+            tbl.f_table_name || '_sub',
+            tbl.key_column, tbl.f_geometry_column, tbl.srid, tbl.f_geometry_column,
+            tbl.f_table_name
+        );
+        EXECUTE format(
+            'CREATE INDEX %I ON %I USING gist (%I)',
+            tbl.f_table_name || '_sub_geom_idx', tbl.f_table_name || '_sub',
+            tbl.f_geometry_column
+        );
+        EXECUTE format(
+            'CREATE INDEX %I ON %I (%I)',
+            tbl.f_table_name || '_sub_key_idx', tbl.f_table_name || '_sub',
+            tbl.key_column
+        );
+        EXECUTE format('ANALYZE %I', tbl.f_table_name || '_sub');
+    END LOOP;
+END
+$$;
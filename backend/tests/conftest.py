@@ -1,39 +1,167 @@
 """
 Pytest configuration and fixtures for API testing.
 """
+from unittest.mock import AsyncMock
+
 import pytest
 import pytest_asyncio
+from databases import Database
 from httpx import AsyncClient, ASGITransport
 from app.main import app
-from app.database import database
+from app.database import connect_database, database, disconnect_database
+from app.routers.geologic import geojson_cache, get_service as get_geologic_service
+from app.routers.photos import get_service as get_photos_service
+from app.services.geologic_service import GeologicDataService
+from app.services.photos_service import PhotosService
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Mark every test that never touches the database pool as nodb.
+    
+    `pytest -m nodb` then runs the DB-free tests without Postgres.
+    """
+    for item in items:
+        if "db_pool" not in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.nodb)
+
+
+@pytest_asyncio.fixture(scope="session")
+async def db_pool():
+    """
+    Connect the database pool once for the whole test session.
+    
+    Tests share the pool instead of paying for a new connection handshake
+    each; the pool is closed after the last test.
+    """
+    await connect_database()
+    yield database
+    await disconnect_database()
 
 
 @pytest_asyncio.fixture(scope="function")
-async def client():
+async def client(db_pool):
     """
     Create an async test client for the FastAPI app.
     
-    This fixture connects to the real database for integration testing.
+    This fixture uses the real database for integration testing.
     """
-    # Connect to database
-    await database.connect()
-    
-    # Create async client
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+
+
+def mock_database() -> AsyncMock:
+    """
+    Create a stand-in for the global Database that answers without Postgres.
     
-    # Disconnect from database
-    await database.disconnect()
+    Queries return no rows and the pool reports as not connected, as an
+    empty, disconnected database would.
+    """
+    mock = AsyncMock(spec=Database)
+    mock.fetch_all.return_value = []
+    mock.fetch_one.return_value = None
+    mock.fetch_val.return_value = None
+    mock.is_connected = False
+    return mock
+
+
+@pytest.fixture
+def fake_database():
+    """The mock_database() that client_no_db installs for a test."""
+    return mock_database()
+
+
+@pytest.fixture
+def geometry_tables(fake_database):
+    """
+    Register tables in the mocked geometry_columns metadata.
+    
+    Returns a function taking the table name, its columns and optionally
+    geometry_column, srid, primary_key (column, type) and column_types;
+    client_no_db's services then discover the table like a real one.
+    """
+    rows = []
+    
+    async def fetch_all(query, values=None):
+        # Only the SQL template cache reads the per-table column lists
+        return list(rows) if "array_agg" in query else []
+    
+    fake_database.fetch_all.side_effect = fetch_all
+    
+    def register(
+        table_name,
+        columns,
+        geometry_column="geom",
+        srid=4326,
+        primary_key=None,
+        column_types=None
+    ):
+        rows.append({
+            "f_table_name": table_name,
+            "f_geometry_column": geometry_column,
+            "srid": srid,
+            "columns": list(columns),
+            "column_types": list(column_types) if column_types else None,
+            "primary_key": primary_key[0] if primary_key else None,
+            "primary_key_type": primary_key[1] if primary_key else None,
+        })
+    
+    return register
+
+
+@pytest.fixture
+def feature_queries(monkeypatch):
+    """
+    Record the feature queries the geologic service runs.
+    
+    Collection queries return an empty FeatureCollection and streamed
+    queries no rows. Returns the list of (query, args) calls.
+    """
+    calls = []
+    
+    async def fetch_row(query, *args):
+        calls.append((query, args))
+        return {"geojson": '{"type": "FeatureCollection", "features": []}', "etag": "0"}
+    
+    async def iterate_values(query, *args, prefetch=200):
+        calls.append((query, args))
+        return
+        yield
+    
+    monkeypatch.setattr("app.services.geologic_service.fetch_row", fetch_row)
+    monkeypatch.setattr("app.services.geologic_service.iterate_values", iterate_values)
+    # Earlier tests may have cached a response for the same request
+    geojson_cache.clear()
+    return calls
 
 
 @pytest_asyncio.fixture(scope="function")
-async def client_no_db():
+async def client_no_db(monkeypatch, fake_database):
     """
     Create an async test client without database connection.
     
-    Useful for testing endpoints that don't require database access.
+    The global database is replaced by mock_database() wherever it was
+    imported, and the services are rebuilt on the mock, so endpoints that
+    do reach the database get empty results instead of hanging.
     """
+    fake = fake_database
+    for module in ("app.database", "app.main", "app.routers.geologic", "app.routers.photos"):
+        monkeypatch.setattr(f"{module}.database", fake)
+    
+    # One instance per test, like the cached services of the app
+    geologic_service = GeologicDataService(fake)
+    photos_service = PhotosService(fake)
+    overrides = {
+        get_geologic_service: lambda: geologic_service,
+        get_photos_service: lambda: photos_service,
+    }
+    app.dependency_overrides.update(overrides)
+    
     transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            yield ac
+    finally:
+        for dependency in overrides:
+            app.dependency_overrides.pop(dependency, None)
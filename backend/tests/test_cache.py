@@ -0,0 +1,38 @@
+"""
+Tests for the in-process response cache.
+"""
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_by_total_size():
+    """Test that the oldest entries are evicted once the values outgrow maxbytes."""
+    cache = TTLCache(maxsize=10, ttl=60, maxbytes=10, sizeof=len)
+    cache.set("a", b"1234")
+    cache.set("b", b"5678")
+    cache.set("c", b"90ab")
+    
+    assert cache.get("a") is None
+    assert cache.get("b") == b"5678"
+    assert cache.get("c") == b"90ab"
+    assert cache.nbytes == 8
+
+
+def test_ttl_cache_skips_values_larger_than_maxbytes():
+    """Test that a value larger than maxbytes is not stored and evicts nothing."""
+    cache = TTLCache(maxsize=10, ttl=60, maxbytes=10, sizeof=len)
+    cache.set("a", b"1234")
+    cache.set("big", b"x" * 11)
+    
+    assert cache.get("big") is None
+    assert cache.get("a") == b"1234"
+    assert cache.nbytes == 4
+
+
+def test_ttl_cache_replacing_a_key_releases_its_size():
+    """Test that storing a key again counts only the new value's size."""
+    cache = TTLCache(maxsize=10, ttl=60, maxbytes=10, sizeof=len)
+    cache.set("a", b"1234")
+    cache.set("a", b"12")
+    
+    assert len(cache) == 1
+    assert cache.nbytes == 2
@@ -3,13 +3,21 @@ Essential endpoint tests for the Geologic Data API.
 
 Tests cover main endpoints with happy path scenarios.
 """
+from unittest.mock import AsyncMock, Mock
+
+import orjson
 import pytest
+from asyncpg.exceptions import InvalidDatetimeFormatError
+
+from app.config import settings
+from app.main import app, lifespan
+from app.utils.query_builder import BBOX_COLUMNS
 
 
 @pytest.mark.asyncio
-async def test_root_endpoint(client):
+async def test_root_endpoint(client_no_db):
     """Test that the root endpoint returns API information."""
-    response = await client.get("/")
+    response = await client_no_db.get("/")
     
     assert response.status_code == 200
     data = response.json()
@@ -20,6 +28,31 @@ async def test_root_endpoint(client):
     assert data["name"] == "Geologic Data API"
 
 
+@pytest.mark.asyncio
+async def test_startup_survives_failed_cache_warmup(monkeypatch):
+    """Test that a service failing to warm its caches does not abort startup."""
+    geologic_service = Mock(warm=AsyncMock(side_effect=RuntimeError("relation does not exist")))
+    photos_service = Mock(warm=AsyncMock())
+    monkeypatch.setattr("app.main.connect_database", AsyncMock())
+    monkeypatch.setattr("app.main.disconnect_database", AsyncMock())
+    monkeypatch.setattr("app.main.get_geologic_service", lambda: geologic_service)
+    monkeypatch.setattr("app.main.get_photos_service", lambda: photos_service)
+    
+    async with lifespan(app):
+        pass
+    
+    photos_service.warm.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_legacy_atlas_maps_redirects(client_no_db):
+    """Test that the legacy atlas_maps endpoint redirects to the v1 route."""
+    response = await client_no_db.get("/atlas_maps")
+    
+    assert response.status_code == 308
+    assert response.headers["location"] == "/api/v1/geologic/atlas_maps"
+
+
 @pytest.mark.asyncio
 async def test_health_endpoint(client):
     """Test that the health check endpoint returns healthy status."""
@@ -30,6 +63,7 @@ async def test_health_endpoint(client):
     
     assert data["status"] == "healthy"
     assert data["database"] == "connected"
+    assert data["pool"]["max_size"] >= data["pool"]["min_size"]
 
 
 @pytest.mark.asyncio
@@ -54,9 +88,64 @@ async def test_list_tables(client):
 
 
 @pytest.mark.asyncio
-async def test_get_features_atlas_maps(client):
-    """Test that fetching features from atlas_maps returns GeoJSON."""
-    response = await client.get("/api/v1/geologic/atlas_maps?limit=5")
+async def test_list_tables_exact_count(client):
+    """Test that exact_count returns the same tables with non-negative counts."""
+    response = await client.get("/api/v1/geologic/tables?exact_count=true")
+    
+    assert response.status_code == 200
+    data = response.json()
+    
+    estimated = (await client.get("/api/v1/geologic/tables")).json()
+    assert [t["name"] for t in data["tables"]] == [t["name"] for t in estimated["tables"]]
+    assert all(t["feature_count"] >= 0 for t in data["tables"])
+
+
+@pytest.mark.asyncio
+async def test_list_tables_does_not_count_unanalyzed_tables(client_no_db, fake_database):
+    """Test that a never-analyzed table is listed with 0 features instead of being counted."""
+    queries = []
+    
+    async def fetch_all(query, values=None):
+        queries.append(query)
+        if "reltuples" in query:
+            return [{"table_name": "atlas_maps", "geometry_type": "POLYGON", "estimated_count": -1}]
+        return []
+    
+    fake_database.fetch_all.side_effect = fetch_all
+    
+    response = await client_no_db.get("/api/v1/geologic/tables")
+    
+    assert response.status_code == 200
+    assert response.json()["tables"][0]["feature_count"] == 0
+    assert not any("COUNT(*)" in query for query in queries)
+
+
+@pytest.mark.asyncio
+async def test_list_tables_exact_count_error_is_not_hidden(client_no_db, fake_database):
+    """Test that a failed exact count is an error, not estimates labelled as exact."""
+    async def fetch_all(query, values=None):
+        if "COUNT(*)" in query:
+            raise RuntimeError("permission denied for table atlas_maps")
+        if "reltuples" in query:
+            return [{"table_name": "atlas_maps", "geometry_type": "POLYGON", "estimated_count": 10}]
+        return []
+    
+    fake_database.fetch_all.side_effect = fetch_all
+    
+    response = await client_no_db.get("/api/v1/geologic/tables?exact_count=true")
+    
+    assert response.status_code == 500
+    assert "permission denied" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", [
+    "/api/v1/geologic/atlas_maps?limit=5",
+    "/api/v1/geologic/atlas_maps?limit=2&offset=2",
+])
+async def test_get_features(client, path):
+    """Test that fetching features returns GeoJSON."""
+    response = await client.get(path)
     
     assert response.status_code == 200
     data = response.json()
@@ -74,6 +163,56 @@ async def test_get_features_atlas_maps(client):
         assert "properties" in feature
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path, queries", [
+    ("/api/v1/geologic/atlas_maps", 2),
+    ("/api/v1/geologic/atlas_maps?limit=2", 1),
+])
+async def test_only_streamed_pages_are_cached(client_no_db, geometry_tables, feature_queries, path, queries):
+    """Test that whole-table streams are never buffered for the cache, while pages are."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    
+    first = await client_no_db.get(path)
+    second = await client_no_db.get(path)
+    
+    assert first.status_code == second.status_code == 200
+    assert len(feature_queries) == queries
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path, cache_control", [
+    ("/api/v1/geologic/atlas_maps?limit=2", None),
+    ("/api/v1/geologic/atlas_maps/filter?limit=2", "public, max-age="),
+    (
+        "/api/v1/geologic/atlas_maps/bbox?min_lng=-105&min_lat=31&max_lng=-104&max_lat=32",
+        "public, max-age="
+    ),
+])
+async def test_only_filtered_responses_are_shared_cacheable(
+    client_no_db, geometry_tables, feature_queries, path, cache_control
+):
+    """Test that Cache-Control: public is sent for filter and bbox responses only."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    
+    await client_no_db.get(path)
+    response = await client_no_db.get(path)
+    
+    assert response.status_code == 200
+    assert "etag" in response.headers
+    if cache_control is None:
+        assert "cache-control" not in response.headers
+    else:
+        assert response.headers["cache-control"].startswith(cache_control)
+
+
+@pytest.mark.asyncio
+async def test_get_invalid_table_returns_404(client_no_db):
+    """Test that requesting features from an unknown table returns 404."""
+    response = await client_no_db.get("/api/v1/geologic/nonexistent_table_xyz")
+    
+    assert response.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_get_features_pagination(client):
     """Test that pagination works correctly."""
@@ -98,11 +237,139 @@ async def test_get_features_pagination(client):
 
 
 @pytest.mark.asyncio
-async def test_get_invalid_table_returns_404(client):
-    """Test that requesting a non-existent table returns 404."""
-    response = await client.get("/api/v1/geologic/nonexistent_table_xyz")
+@pytest.mark.parametrize("path", [
+    "/api/v1/geologic/atlas_maps?after=abc",
+    "/api/v1/geologic/atlas_maps/filter?after=abc",
+    "/api/v1/geologic/atlas_maps/filter?after=99999999999",
+    "/api/v1/geologic/atlas_maps/bbox?min_lng=-105&min_lat=31&max_lng=-104&max_lat=32&after=1.5",
+])
+async def test_keyset_pagination_invalid_cursor_returns_422(
+    client_no_db, geometry_tables, feature_queries, path
+):
+    """Test that a cursor that is not a valid key value is rejected before querying."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
     
-    assert response.status_code == 404
+    response = await client_no_db.get(path)
+    
+    assert response.status_code == 422
+    assert "Invalid cursor" in response.json()["detail"]
+    assert feature_queries == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("after, status", [("2024-05-01", 200), ("not-a-date", 422)])
+async def test_keyset_pagination_checks_other_key_types_in_postgres(
+    client_no_db, geometry_tables, feature_queries, monkeypatch, after, status
+):
+    """Test that cursors for other key types are cast by Postgres before the feature query."""
+    geometry_tables("atlas_maps", ["surveyed", "Name", "geom"], primary_key=("surveyed", "date"))
+    casts = []
+    
+    async def fetch_value(query, *args):
+        casts.append((query, args))
+        if args[0] == "not-a-date":
+            raise InvalidDatetimeFormatError("invalid input syntax for type date")
+    
+    monkeypatch.setattr("app.services.geologic_service.fetch_value", fetch_value)
+    
+    response = await client_no_db.get(f"/api/v1/geologic/atlas_maps?after={after}")
+    
+    assert response.status_code == status
+    assert casts == [("SELECT CAST(CAST($1 AS text) AS date)", (after,))]
+    assert len(feature_queries) == (1 if status == 200 else 0)
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_without_primary_key_returns_422(
+    client_no_db, geometry_tables, feature_queries
+):
+    """Test that a cursor for a table without a primary key is a client error."""
+    geometry_tables("atlas_maps", ["Name", "geom"])
+    
+    response = await client_no_db.get("/api/v1/geologic/atlas_maps/filter?after=1")
+    
+    assert response.status_code == 422
+    assert "no primary key" in response.json()["detail"]
+    assert feature_queries == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("zoom, source", [
+    (6, '"atlas_maps_z8"'),
+    (10, '"atlas_maps_z12"'),
+    (14, '"atlas_maps"'),
+])
+async def test_zoom_reads_simplified_view(client_no_db, geometry_tables, feature_queries, zoom, source):
+    """Test that a zoom level reads the least simplified view covering it."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    geometry_tables("atlas_maps_z8", ["id", "Name", "geom"])
+    geometry_tables("atlas_maps_z12", ["id", "Name", "geom"])
+    
+    response = await client_no_db.get(f"/api/v1/geologic/atlas_maps/filter?zoom={zoom}&limit=2")
+    
+    assert response.status_code == 200
+    (query, _), = feature_queries
+    assert f"FROM {source}" in query
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_over_simplified_view(client_no_db, geometry_tables, feature_queries):
+    """Test that pages of a simplified view are ordered and keyset paged by the table's key."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    geometry_tables("atlas_maps_z8", ["id", "Name", "geom"])
+    
+    first = await client_no_db.get("/api/v1/geologic/atlas_maps/filter?zoom=6&limit=2")
+    second = await client_no_db.get("/api/v1/geologic/atlas_maps/filter?zoom=6&limit=2&after=2")
+    
+    assert first.status_code == 200
+    assert second.status_code == 200
+    
+    # The view has no primary key of its own; it is paged by the table's
+    for query, _ in feature_queries:
+        assert 'FROM "atlas_maps_z8"' in query
+        assert 'ORDER BY "id"' in query
+
+
+BBOX_PATH = "/api/v1/geologic/atlas_maps/bbox?min_lng=-105&min_lat=31&max_lng=-104&max_lat=32"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("columns, index_column", [
+    (["id", "Name", "env", "geom"], '"env"'),
+    (["id", "Name", "geom"], '"geom"'),
+])
+async def test_bbox_column_override(
+    client_no_db, geometry_tables, feature_queries, monkeypatch, columns, index_column
+):
+    """Test that a table's BBOX_COLUMNS override is the bbox index column when the table has it."""
+    monkeypatch.setitem(BBOX_COLUMNS, "atlas_maps", "env")
+    if "env" in columns:
+        geometry_tables("atlas_maps", columns, geometry_column="env")
+    geometry_tables("atlas_maps", columns)
+    
+    response = await client_no_db.get(BBOX_PATH)
+    
+    assert response.status_code == 200
+    (query, _), = feature_queries
+    assert f"{index_column} && (SELECT g FROM bbox_q)" in query
+    if "env" in columns:
+        # The envelope is never returned as a property
+        assert 'SELECT "id", "Name", "geom" FROM' in query
+
+
+@pytest.mark.asyncio
+async def test_bbox_matches_subdivided_pieces(client_no_db, geometry_tables, feature_queries):
+    """Test that a table with <table>_sub pieces matches the bbox against the pieces."""
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    geometry_tables("atlas_maps_sub", ["id", "geom"])
+    
+    response = await client_no_db.get(BBOX_PATH)
+    hidden = await client_no_db.get("/api/v1/geologic/atlas_maps_sub")
+    
+    assert response.status_code == 200
+    assert hidden.status_code == 404
+    (query, _), = feature_queries
+    assert 'FROM "atlas_maps_sub" s' in query
 
 
 @pytest.mark.asyncio
@@ -125,6 +392,36 @@ async def test_photos_list(client):
         assert "geometry" in photo
 
 
+@pytest.mark.asyncio
+async def test_photos_list_skips_jsonable_encoder(client_no_db, fake_database, monkeypatch):
+    """Test that photo lists are serialized by pydantic-core, not walked by jsonable_encoder."""
+    line = {"type": "LineString", "coordinates": [[-104.5, 31.5], [-104.4, 31.6]]}
+    photos = [
+        {"id": 1, "name": "Panel 1", "hyperlink": "p1.jpg", "length": 12, "geometry": line},
+        {"id": 2, "name": "Panel 2", "hyperlink": None, "length": 3.5, "geometry": None},
+    ]
+    
+    async def fetch_one(query, values=None):
+        if "jsonb_agg" in query:
+            return {"photos": orjson.dumps(photos).decode()}
+        return None
+    
+    def jsonable_encoder(*args, **kwargs):
+        raise AssertionError("photo lists must not go through jsonable_encoder")
+    
+    fake_database.fetch_one.side_effect = fetch_one
+    monkeypatch.setattr("fastapi.routing.jsonable_encoder", jsonable_encoder)
+    
+    response = await client_no_db.get("/api/v1/photos?limit=2")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert data["total"] == 2
+    assert data["photos"][0]["geometry"] == line
+    assert data["photos"][1]["map_symbol"] is None
+
+
 @pytest.mark.asyncio
 async def test_photos_get_by_id(client):
     """Test that fetching a photo by ID works."""
@@ -145,6 +442,24 @@ async def test_photos_get_by_id(client):
         assert "properties" in data
 
 
+@pytest.mark.asyncio
+async def test_photo_url_falls_back_to_database(client_no_db, fake_database):
+    """Test that a panel missing from the startup URL map is looked up in the database."""
+    async def fetch_one(query, values=None):
+        if values == {"photo_id": 42}:
+            return {"hyperlink": "https://example.com/panel_42.jpg"}
+        return None
+    
+    fake_database.fetch_one.side_effect = fetch_one
+    
+    response = await client_no_db.get("/api/v1/photos/42/url")
+    missing = await client_no_db.get("/api/v1/photos/43/url")
+    
+    assert response.status_code == 200
+    assert response.json() == {"photo_id": 42, "url": "https://example.com/panel_42.jpg"}
+    assert missing.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_photos_invalid_id_returns_404(client):
     """Test that requesting a non-existent photo returns 404."""
@@ -162,8 +477,205 @@ async def test_features_filter_with_bbox(client):
     )
     
     assert response.status_code == 200
+    assert response.headers["content-type"] == "application/geo+json"
     data = response.json()
     
     assert data["type"] == "FeatureCollection"
     assert "features" in data
 
+
+@pytest.mark.asyncio
+async def test_features_filter_by_name(client):
+    """Test that the name filter returns only features whose name contains the term."""
+    page = (await client.get("/api/v1/geologic/atlas_maps?limit=20")).json()
+    names = [
+        name for feature in page["features"]
+        for name in (feature["properties"].get(key) for key in ("Name", "NAME", "name"))
+        if name and str(name)[:3].isalnum()
+    ]
+    if not names:
+        pytest.skip("atlas_maps has no named features")
+    term = str(names[0])[:3]
+    
+    response = await client.get(
+        "/api/v1/geologic/atlas_maps/filter", params={"name": term, "limit": 50}
+    )
+    
+    assert response.status_code == 200
+    features = response.json()["features"]
+    assert features
+    for feature in features:
+        feature_names = [
+            str(feature["properties"].get(key) or "") for key in ("Name", "NAME", "name")
+        ]
+        assert any(term.lower() in name.lower() for name in feature_names)
+
+
+@pytest.mark.asyncio
+async def test_features_filter_by_name_is_case_insensitive(client):
+    """Test that the name filter matches regardless of case."""
+    lower = await client.get("/api/v1/geologic/atlas_maps/filter?name=a&limit=5")
+    upper = await client.get("/api/v1/geologic/atlas_maps/filter?name=A&limit=5")
+    
+    assert lower.status_code == 200
+    assert upper.status_code == 200
+    assert lower.json() == upper.json()
+
+
+@pytest.mark.asyncio
+async def test_features_bbox_index_only(client):
+    """Test that a bbox query can skip the exact intersection test."""
+    response = await client.get(
+        "/api/v1/geologic/atlas_maps/bbox"
+        "?min_lng=-105&min_lat=31&max_lng=-104&max_lat=32&limit=5&exact=false"
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert response.json()["type"] == "FeatureCollection"
+
+
+@pytest.mark.asyncio
+async def test_features_etag_not_modified(client):
+    """Test that a matching If-None-Match returns 304 without a body."""
+    response = await client.get("/api/v1/geologic/atlas_maps/filter?limit=5")
+    
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    
+    cached = await client.get(
+        "/api/v1/geologic/atlas_maps/filter?limit=5",
+        headers={"If-None-Match": etag}
+    )
+    
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+
+@pytest.mark.asyncio
+async def test_features_filter_invalid_bbox_returns_422(client_no_db):
+    """Test that a malformed bounding box is rejected instead of ignored."""
+    response = await client_no_db.get("/api/v1/geologic/atlas_maps/filter?bbox=-105,31,-104")
+    
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_table_extent(client):
+    """Test that a table's extent is a WGS84 bounding box."""
+    response = await client.get("/api/v1/geologic/atlas_maps/extent")
+    
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert data["name"] == "atlas_maps"
+    min_lng, min_lat, max_lng, max_lat = data["bbox"]
+    assert -180 <= min_lng <= max_lng <= 180
+    assert -90 <= min_lat <= max_lat <= 90
+
+
+@pytest.mark.asyncio
+async def test_features_mvt_tile(client):
+    """Test that a vector tile is served with long-lived caching headers."""
+    response = await client.get("/api/v1/geologic/atlas_maps/mvt/6/13/26")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert "immutable" in response.headers["cache-control"]
+
+
+@pytest.mark.asyncio
+async def test_features_mvt_out_of_range_returns_422(client_no_db):
+    """Test that tile coordinates outside the zoom level are rejected."""
+    response = await client_no_db.get("/api/v1/geologic/atlas_maps/mvt/2/4/0")
+    
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_cors_preflight_allows_conditional_get(client_no_db):
+    """Test that CORS preflight allows GET with an If-None-Match header."""
+    response = await client_no_db.options(
+        "/api/v1/geologic/tables",
+        headers={
+            "Origin": "http://localhost:5173",
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "if-none-match"
+        }
+    )
+    
+    assert response.status_code == 200
+    assert "GET" in response.headers["access-control-allow-methods"]
+
+
+@pytest.mark.asyncio
+async def test_debug_pool_endpoint(client):
+    """Test that pool diagnostics report the pool size and acquire latency."""
+    response = await client.get("/debug/pool")
+    
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert data["pool"]["size"] >= 0
+    assert "p95_ms" in data["acquire"]
+
+
+@pytest.mark.asyncio
+async def test_admin_cache_invalidate_disabled_without_token(client_no_db, monkeypatch):
+    """Test that cache invalidation does not exist when no admin token is configured."""
+    monkeypatch.setattr(settings, "admin_token", None)
+    
+    response = await client_no_db.post(
+        "/api/v1/admin/cache/invalidate",
+        headers={"X-Admin-Token": "test-token"}
+    )
+    
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong-token"}])
+async def test_admin_cache_invalidate_rejects_bad_token(client_no_db, monkeypatch, headers):
+    """Test that a missing or wrong admin token is refused when one is configured."""
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    
+    response = await client_no_db.post("/api/v1/admin/cache/invalidate", headers=headers)
+    
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_admin_cache_invalidate_clears_caches(
+    client_no_db, monkeypatch, geometry_tables, feature_queries
+):
+    """Test that a valid admin token makes the next requests reload responses and metadata."""
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    geometry_tables("atlas_maps", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    
+    await client_no_db.get("/api/v1/geologic/atlas_maps/filter?limit=2")
+    # Loaded after the metadata was cached, so not yet visible
+    geometry_tables("fan_geology", ["id", "Name", "geom"], primary_key=("id", "integer"))
+    assert (await client_no_db.get("/api/v1/geologic/fan_geology/filter?limit=2")).status_code == 404
+    
+    response = await client_no_db.post(
+        "/api/v1/admin/cache/invalidate",
+        headers={"X-Admin-Token": "test-token"}
+    )
+    
+    assert response.status_code == 200
+    assert (await client_no_db.get("/api/v1/geologic/fan_geology/filter?limit=2")).status_code == 200
+    await client_no_db.get("/api/v1/geologic/atlas_maps/filter?limit=2")
+    # The cached atlas_maps page was dropped, so it was queried again
+    assert len(feature_queries) == 3
+
+
+@pytest.mark.asyncio
+async def test_photos_bbox_mvt_format(client):
+    """Test that photos in a bounding box can be fetched as a vector tile."""
+    response = await client.get(
+        "/api/v1/photos/bbox?min_lng=-105&min_lat=31&max_lng=-103&max_lat=33&format=mvt"
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
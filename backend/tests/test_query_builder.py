@@ -0,0 +1,153 @@
+"""
+Tests for the SQL query builder.
+
+These check the SQL text built for each filter without running it; the
+endpoint tests run the queries against the database.
+"""
+import pytest
+
+from app.models.geologic import FeatureFilters
+from app.utils.query_builder import build_filter_conditions, build_geojson_query
+
+
+BBOX = (-105.0, 31.0, -104.0, 32.0)
+
+
+def test_primary_key_orders_pages_and_after_seeks_past_it():
+    """Test that pages are ordered by the primary key and after replaces offset."""
+    first, first_params = build_geojson_query(
+        "atlas_maps", "geom", FeatureFilters(limit=2), primary_key=("id", "integer")
+    )
+    second, second_params = build_geojson_query(
+        "atlas_maps", "geom", FeatureFilters(limit=2, after="2"), primary_key=("id", "integer")
+    )
+    
+    assert 'ORDER BY "id"' in first
+    assert "OFFSET :offset" in first
+    assert 'ORDER BY "id"' in second
+    assert '"id" > CAST(CAST(:after AS text) AS integer)' in second
+    assert "OFFSET" not in second
+    assert "after" not in first_params
+    assert second_params["after"] == "2"
+
+
+def test_after_without_primary_key_raises():
+    """Test that a cursor cannot be applied to a table without a primary key."""
+    with pytest.raises(ValueError, match="no primary key"):
+        build_geojson_query("atlas_maps", "geom", FeatureFilters(after="1"))
+
+
+@pytest.mark.parametrize("columns, condition", [
+    (["id", "Name", "name_norm", "geom"], '"name_norm" ILIKE :name_pattern'),
+    (
+        ["id", "Name", "NAME", "geom"],
+        '(CAST("Name" AS TEXT) ILIKE :name_pattern OR CAST("NAME" AS TEXT) ILIKE :name_pattern)'
+    ),
+    (["id", "geom"], "FALSE"),
+])
+def test_name_filter_columns(columns, condition):
+    """Test that the name filter uses name_norm when the table has it, else the name columns."""
+    _, conditions, params = build_filter_conditions(
+        "atlas_maps", FeatureFilters(name="Brushy"), "geom", columns=columns
+    )
+    
+    assert conditions == [condition]
+    assert params == {"name_pattern": "%brushy%"}
+
+
+def test_equality_filters_cast_only_mismatched_columns():
+    """Test that equality filters compare same-typed columns as they are and cast the rest."""
+    filters = FeatureFilters(feature_type="Channel", region="North", fan_id=3, map_symbol="Pbc")
+    column_types = [
+        ("id", "integer"),
+        ("FEATURETYP", "character varying"),
+        ("REGION", "integer"),
+        ("FanID", "text"),
+        ("geom", "geometry"),
+    ]
+    
+    _, conditions, params = build_filter_conditions(
+        "atlas_maps", filters, "geom", column_types=column_types
+    )
+    
+    assert conditions == [
+        # None of the map symbol columns exist, so the filter matches nothing
+        "FALSE",
+        '"FEATURETYP" = :feature_type',
+        'CAST("REGION" AS TEXT) = :region',
+        'CAST("FanID" AS INTEGER) = :fan_id',
+    ]
+    assert params == {"map_symbol": "Pbc", "feature_type": "Channel", "region": "North", "fan_id": 3}
+
+
+def test_property_subset_is_quoted_and_keyed_as_tuple():
+    """Test that a property subset selects each column quoted and shares templates across sequences."""
+    filters = FeatureFilters(name="brushy")
+    
+    as_list, _ = build_geojson_query("atlas_maps", "geom", filters, properties=["id", 'Rock "Unit"'])
+    as_tuple, _ = build_geojson_query("atlas_maps", "geom", filters, properties=("id", 'Rock "Unit"'))
+    
+    assert 'SELECT "id", "Rock ""Unit""", "geom" FROM "atlas_maps"' in as_list
+    assert as_list is as_tuple
+
+
+@pytest.mark.parametrize("columns, bbox_column, index_column", [
+    (["id", "geom"], None, '"geom"'),
+    (["id", "bbox", "geom"], None, '"bbox"'),
+    (["id", "env", "geom"], "env", '"env"'),
+])
+def test_bbox_index_column(columns, bbox_column, index_column):
+    """Test that the bbox index test uses a stored envelope and the exact test the geometry."""
+    ctes, conditions, params = build_filter_conditions(
+        "atlas_maps", FeatureFilters(bbox=BBOX), "geom", columns=columns, bbox_column=bbox_column
+    )
+    
+    assert ctes == ["bbox_q AS (SELECT ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326) AS g)"]
+    assert conditions == [
+        f"{index_column} && (SELECT g FROM bbox_q)",
+        'ST_Intersects("geom", (SELECT g FROM bbox_q))',
+    ]
+    assert params == dict(zip(("min_lng", "min_lat", "max_lng", "max_lat"), BBOX))
+
+
+def test_bbox_index_only_skips_exact_test():
+    """Test that accepting bounding box false positives drops ST_Intersects."""
+    filters = FeatureFilters(bbox=BBOX, bbox_false_positives_ok=True)
+    
+    _, conditions, _ = build_filter_conditions("atlas_maps", filters, "geom")
+    
+    assert conditions == ['"geom" && (SELECT g FROM bbox_q)']
+
+
+def test_bbox_is_transformed_to_the_column_srid():
+    """Test that the WGS84 envelope is transformed into a projected column's SRID."""
+    ctes, _, _ = build_filter_conditions("atlas_maps", FeatureFilters(bbox=BBOX), "geom", srid=26913)
+    
+    assert "ST_Transform(ST_MakeEnvelope(" in ctes[0]
+    assert ctes[0].endswith(", 26913) AS g)")
+
+
+@pytest.mark.parametrize("primary_key, matches_pieces", [
+    (("id", "integer"), True),
+    (None, False),
+])
+def test_bbox_matches_subdivided_pieces(primary_key, matches_pieces):
+    """Test that pieces are matched when they can be joined back by the primary key."""
+    query, _ = build_geojson_query(
+        "atlas_maps",
+        "geom",
+        FeatureFilters(bbox=BBOX),
+        primary_key=primary_key,
+        subdivided="atlas_maps_sub"
+    )
+    
+    if matches_pieces:
+        assert 'FROM "atlas_maps_sub" s' in query
+        assert 's."id" = "atlas_maps"."id"' in query
+        assert 's."geom" && (SELECT g FROM bbox_q)' in query
+        assert 'ST_Intersects(s."geom", (SELECT g FROM bbox_q))' in query
+        assert 'ST_Intersects("geom"' not in query
+    else:
+        assert "EXISTS" not in query
+        assert '"geom" && (SELECT g FROM bbox_q)' in query
+        assert 'ST_Intersects("geom", (SELECT g FROM bbox_q))' in query
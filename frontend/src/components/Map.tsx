@@ -140,7 +140,7 @@ const Map: React.FC<MapProps> = ({ geojson, onFeatureClick }) => {
 
                onFeatureClick({
                     properties,
-                    photoUrl: photoData?.url?.url || null,
+                    photoUrl: photoData?.url || null,
                   });
                 } catch (error) {
                   console.error("Error fetching photo URL:", error);